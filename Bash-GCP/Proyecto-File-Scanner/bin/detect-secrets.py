@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
-import os, re, json, sys, tempfile, shutil, requests
+import os, io, re, json, sys, mmap, time, hashlib, functools, tarfile, tempfile, shutil, argparse, subprocess, requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlparse
+from itertools import repeat
 from datetime import datetime
 
 PATTERNS = {
@@ -13,8 +16,149 @@ PATTERNS = {
     'CUSTOM_PATTERNS': [r'(?i)crm[_-]?key\s*[:=]\s*["\']?([a-zA-Z0-9]{32,})["\']?', r'l7xx[a-zA-Z0-9]{30,}']
 }
 
+CRITICAL_TYPES = {'PRIVATE_KEYS', 'AWS_CREDENTIALS', 'DATABASE_CREDENTIALS', 'CUSTOM_PATTERNS'}
+SEVERITY = {t: 'CRITICAL' if t in CRITICAL_TYPES else 'HIGH' for t in PATTERNS}
+
+def build_engine(patterns):
+    # Todas las reglas en una sola alternancia precompilada: un grupo nombrado por regla
+    rules, alts = [], []
+    for stype, pats in patterns.items():
+        for pat in pats:
+            body = pat[4:] if pat.startswith('(?i)') else f'(?-i:{pat})'
+            alts.append(f'(?P<r{len(rules)}>{body})')
+            rules.append((stype, re.compile(pat)))
+    # Si toda regla empieza con un literal, una anticipación por primer carácter descarta
+    # de inmediato las posiciones que no pueden iniciar ninguna coincidencia
+    heads = {pat[4] if pat.startswith('(?i)') else pat[0] for pats in patterns.values() for pat in pats}
+    guard = f"(?=[{''.join(re.escape(h) for h in sorted(heads))}])" if all(h.isalnum() or h == '-' for h in heads) else ''
+    return re.compile(f"{guard}(?:{'|'.join(alts)})", re.I), rules
+
+WS_ASCII = r' \t\n\r\f\v\x1c-\x1f'  # Lo que acepta \s de str en ASCII; el \s de bytes omite \x1c-\x1f
+
+def bytes_pattern(pat):
+    # Patrón de texto → bytes con \s/\S explícitos, para coincidir igual en líneas ASCII
+    out, i, in_class = [], 0, False
+    while i < len(pat):
+        c = pat[i]
+        if c == '\\':
+            esc = pat[i:i + 2]
+            if esc == r'\s':
+                out.append(WS_ASCII if in_class else f'[{WS_ASCII}]')
+            elif esc == r'\S' and not in_class:
+                out.append(f'[^{WS_ASCII}]')
+            else:
+                out.append(esc)
+            i += 2
+            continue
+        if c == '[' and not in_class:
+            in_class = True
+            j = i + 1 + (pat[i + 1:i + 2] == '^')
+            j += pat[j:j + 1] == ']'  # ']' inicial es literal
+            out.append(pat[i:j])
+            i = j
+            continue
+        if c == ']':
+            in_class = False
+        out.append(c)
+        i += 1
+    return ''.join(out).encode()
+
+ENGINE, RULES = build_engine(PATTERNS)
+# Mismo motor sobre bytes: en líneas ASCII coincide exactamente con el de texto
+ENGINE_B = re.compile(bytes_pattern(ENGINE.pattern), re.I)
+RULES_B = [(stype, re.compile(bytes_pattern(rx.pattern))) for stype, rx in RULES]
+
+def match_type(line, engine=ENGINE, rules=RULES):
+    m = engine.search(line)
+    if not m:
+        return None
+    i = int(m.lastgroup[1:])
+    # Una regla anterior puede coincidir más a la derecha: se respeta el orden de PATTERNS
+    for stype, rx in rules[:i]:
+        if rx.search(line):
+            return stype
+    return rules[i][0]
+
+def rule_keywords(patterns):
+    # Prefijo literal (en minúsculas) de cada regla; None si alguna regla no tiene uno
+    kws = set()
+    for pats in patterns.values():
+        for pat in pats:
+            body = pat[4:] if pat.startswith('(?i)') else pat
+            m = re.match(r'[A-Za-z0-9 \-]+', body)
+            kw = m.group() if m else ''
+            if body[len(kw):len(kw) + 1] in ('?', '*', '{'):
+                kw = kw[:-1]  # El último literal es opcional
+            if not kw:
+                return None
+            kws.add(kw.lower().encode())
+    return sorted(k for k in kws if not any(o != k and o in k for o in kws))
+
+KEYWORDS = rule_keywords(PATTERNS)
+
+SCAN_WINDOW = 1024 * 1024  # Ventana del buffer que se copia en minúsculas para el prefiltro
+
+def windows(buf, size=SCAN_WINDOW):
+    # Rangos consecutivos del buffer cortados en fin de línea
+    pos, n = 0, len(buf)
+    while pos < n:
+        end = buf.rfind(b'\n', pos, pos + size) + 1 if pos + size < n else n
+        if end <= pos:
+            end = buf.find(b'\n', pos + size) + 1 or n  # Línea más larga que la ventana
+        yield pos, end
+        pos = end
+
+def candidate_lines(buf):
+    # Prefiltro literal por ventanas: (offset, número de línea) de cada línea con alguna palabra
+    # clave. bytes.lower() solo cambia ASCII, así que los offsets coinciden con los del buffer, y
+    # los números de línea salen de contar '\n' solo hasta cada candidata. None si hay saltos
+    # '\r' sueltos (el modo texto los numera como líneas)
+    found, ln = [], 1
+    for ws, we in windows(buf):
+        low = buf[ws:we].lower()
+        if low.count(b'\r') != low.count(b'\r\n'):
+            return None
+        starts = set()
+        for kw in KEYWORDS:
+            i = low.find(kw)
+            while i != -1:
+                starts.add(low.rfind(b'\n', 0, i) + 1)
+                e = low.find(b'\n', i)
+                i = low.find(kw, e) if e != -1 else -1  # Una coincidencia por línea basta
+        pos = 0
+        for start in sorted(starts):
+            ln += low.count(b'\n', pos, start)
+            pos = start
+            found.append((ws + start, ln))
+        ln += low.count(b'\n', pos)
+    return found
+
+def finding(ln, stype, line, offset=None):
+    fi = {'line': ln, 'type': stype, 'content': line.strip()[:100], 'severity': SEVERITY[stype]}
+    if offset is not None:
+        fi['offset'] = offset  # Hallazgo en la cola muestreada: número de línea desconocido
+    return fi
+
+BATCH_BYTES = 4 * 1024 * 1024  # Tamaño de cada lote enviado a un proceso del pool
+
 EXCLUDED = [r'\.git', r'node_modules', r'__pycache__', r'\.env\.example', r'\.pyc', r'\.zip']
 
+# Clasificador de contenido: extensión, número mágico y byte NUL en el primer bloque
+BINARY_EXT = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.pdf', '.jar', '.war', '.ear', '.class',
+              '.so', '.dll', '.dylib', '.exe', '.o', '.a', '.pb', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.whl',
+              '.woff', '.woff2', '.ttf', '.otf', '.mp3', '.mp4', '.mov', '.avi', '.bin', '.db', '.sqlite', '.parquet'}
+MAGIC = (b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'%PDF', b'PK\x03\x04', b'\x7fELF', b'\x1f\x8b', b'BZh',
+         b'\xfd7zXZ', b"7z\xbc\xaf'\x1c", b'\xca\xfe\xba\xbe', b'SQLite format 3', b'PAR1')
+SNIFF_BYTES = 8192
+MAX_SCAN_BYTES = 50 * 1024 * 1024  # Tope por archivo (--max-size); encima se muestrea u omite
+SAMPLE_BYTES = 1024 * 1024         # Cabeza y cola escaneadas de un archivo que supera el tope
+LONE_CR = re.compile(rb'\r(?!\n)')
+
+# Cache incremental de escaneos locales: hallazgos por archivo con clave (ruta, tamaño, mtime_ns)
+CACHE_FILE = os.path.expanduser('~/.cache/detect-secrets/scan-cache.json')
+CACHE_VERSION = 1
+RACY_NS = 2 * 10**9  # Archivos modificados hace menos de 2s no se cachean (mtime aún ambiguo)
+
 def skip_file(f):
     for p in EXCLUDED:
         if re.search(p, str(f)):
@@ -22,55 +166,466 @@ def skip_file(f):
     return False
 
 def scan_file(fp):
+    # Un hallazgo por línea: el tipo de la primera regla (en orden de PATTERNS) que coincide.
+    # El archivo se mapea en memoria; solo las líneas que pasan el prefiltro llegan a las regex
+    try:
+        with open(fp, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                findings = scan_buffer(mm)
+    except:
+        return []
+    return scan_lines(fp) if findings is None else findings
+
+def match_raw(raw):
+    # (tipo o None, línea decodificada) de una línea en bytes
+    if raw.endswith(b'\r\n'):
+        raw = raw[:-2] + b'\n'
+    if raw.isascii():
+        # Regex de bytes sin decodificar; solo se decodifica la línea si hay hallazgo
+        stype = match_type(raw, ENGINE_B, RULES_B)
+        return stype, raw.decode('ascii') if stype else ''
+    line = raw.decode('utf-8', 'ignore')
+    return match_type(line), line
+
+def scan_buffer(buf, base=None):
+    # bytes o mmap; None si hace falta el recorrido en modo texto. Con base (offset del buffer
+    # dentro del archivo) los hallazgos llevan offset en lugar de número de línea
+    cands = candidate_lines(buf) if KEYWORDS is not None else None
+    if cands is None:
+        return None
     findings = []
-    seen = set()
+    for start, ln in cands:
+        end = buf.find(b'\n', start)
+        raw = buf[start:] if end == -1 else buf[start:end + 1]
+        stype, line = match_raw(raw)
+        if stype and 'example' not in line.lower():
+            findings.append(finding(ln, stype, line) if base is None else finding(None, stype, line, base + start))
+    return findings
+
+def classify(name, head, size, max_bytes):
+    # 'binary', 'oversize' o None si el contenido se escanea completo
+    if os.path.splitext(name)[1].lower() in BINARY_EXT or head.startswith(MAGIC) or b'\0' in head:
+        return 'binary'
+    return 'oversize' if max_bytes and size > max_bytes else None
+
+def scan_path(fp, max_bytes=MAX_SCAN_BYTES, oversize='sample'):
+    # (clase, hallazgos): 'text', 'binary', 'sampled' (cabeza y cola) u 'oversize' (omitido)
+    if os.path.splitext(fp)[1].lower() in BINARY_EXT:
+        return 'binary', []  # Sin abrir el archivo
+    try:
+        with open(fp, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            kind = classify(fp, f.read(SNIFF_BYTES), size, max_bytes)
+            if kind == 'binary' or (kind and oversize == 'skip'):
+                return kind, []
+            if kind:
+                return 'sampled', scan_sample(f, size)
+    except OSError:
+        return 'text', []
+    return 'text', scan_file(fp)
+
+def scan_member(name, f, size, max_bytes=MAX_SCAN_BYTES, oversize='sample'):
+    # Como scan_path, para un flujo no posicionable (miembro de un tar): todo en memoria
+    head = f.read(SNIFF_BYTES)
+    kind = classify(name, head, size, max_bytes)
+    if kind == 'binary' or (kind and oversize == 'skip'):
+        return kind, []
+    if kind:
+        return 'sampled', scan_sample(f, size, head)
+    return 'text', scan_bytes(head + f.read())
+
+def scan_sample(f, size, read=None):
+    # Cabeza con números de línea exactos; en la cola solo se conoce el offset del hallazgo.
+    # read: bytes ya consumidos de un flujo no posicionable (la cola se lee secuencialmente)
+    sample = min(SAMPLE_BYTES, size // 2)
+    if read is None:
+        f.seek(0)
+        head = f.read(sample)
+        f.seek(size - sample)
+        tail = f.read(sample)
+    else:
+        head, tail = read[:sample], read[sample:][-sample:]
+        head += f.read(max(sample - len(read), 0))
+        for chunk in iter(lambda: f.read(SAMPLE_BYTES), b''):
+            tail = (tail + chunk)[-sample:]
+    head = head[:head.rfind(b'\n') + 1] or head
+    cut = tail.find(b'\n') + 1
+    return scan_bytes(head) + scan_bytes(tail[cut:], size - sample + cut)
+
+def scan_bytes(data, base=None):
+    # Buffer en memoria: los '\r' sueltos pasan a '\n' (misma longitud) para numerar como el modo texto
+    if b'\r' in data:
+        data = LONE_CR.sub(b'\n', data)
+    found = scan_buffer(data, base)
+    if found is None:  # Reglas sin prefijo literal: recorrido en modo texto
+        found = scan_text(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='ignore'))
+    return found
+
+def scan_lines(fp):
     try:
         with open(fp, 'r', encoding='utf-8', errors='ignore') as f:
-            for ln, line in enumerate(f, 1):
-                for stype, patterns in PATTERNS.items():
-                    for pat in patterns:
-                        try:
-                            for m in re.finditer(pat, line):
-                                if 'example' not in line.lower():
-                                    dk = (ln, line.strip())
-                                    if dk not in seen:
-                                        seen.add(dk)
-                                        findings.append({'line': ln, 'type': stype, 'content': line.strip()[:100], 'severity': 'CRITICAL' if stype in ['PRIVATE_KEYS', 'AWS_CREDENTIALS', 'DATABASE_CREDENTIALS', 'CUSTOM_PATTERNS'] else 'HIGH'})
-                        except:
-                            pass
+            return scan_text(f)
     except:
-        pass
+        return []
+
+def scan_text(f):
+    findings = []
+    for ln, line in enumerate(f, 1):
+        stype = match_type(line)
+        if stype and 'example' not in line.lower():
+            findings.append(finding(ln, stype, line))
     return findings
 
-def scan_dir(root, out=None):
-    res = {}
-    total = 0
-    print(f"🔍 Escaneando: {root}\n" + "-"*80)
+def walk_files(root):
     for r, ds, fs in os.walk(root):
         ds[:] = [d for d in ds if not skip_file(os.path.join(r, d))]
         for f in fs:
             fp = os.path.join(r, f)
-            if skip_file(fp):
-                continue
-            findings = scan_file(fp)
-            if findings:
-                rp = os.path.relpath(fp, root)
-                res[rp] = findings
-                total += len(findings)
-                print(f"⚠️  {rp}")
-                for fi in findings:
-                    print(f"  {'🔴' if fi['severity']=='CRITICAL' else '🟠'} [{fi['severity']}] L{fi['line']}: {fi['type']}\n     {fi['content'][:80]}")
+            if not skip_file(fp):
+                yield fp
+
+def batches(paths, limit=BATCH_BYTES):
+    # Lotes consecutivos por bytes (no por número de archivos): un dump grande no comparte lote
+    batch, size = [], 0
+    for fp in paths:
+        try:
+            fs = os.path.getsize(fp)
+        except OSError:
+            fs = 0
+        if batch and size + fs > limit:
+            yield batch
+            batch, size = [], 0
+        batch.append(fp)
+        size += fs
+    if batch:
+        yield batch
+
+def scan_batch(paths, max_bytes=MAX_SCAN_BYTES, oversize='sample'):
+    return [(fp, *scan_path(fp, max_bytes, oversize)) for fp in paths]
+
+def scan_results(paths, jobs, max_bytes=MAX_SCAN_BYTES, oversize='sample'):
+    # Resultados en el orden del recorrido; con jobs > 1 los lotes se escanean en paralelo
+    # y se entregan en orden de envío a medida que terminan
+    groups = list(batches(paths))
+    if jobs <= 1 or len(groups) <= 1:
+        for group in groups:
+            yield from scan_batch(group, max_bytes, oversize)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(groups))) as ex:
+        for result in ex.map(scan_batch, groups, repeat(max_bytes), repeat(oversize)):
+            yield from result
+
+def blob_id(fp):
+    # SHA-1 de blob de git: el mismo "id" que devuelve la API de árbol de GitLab
+    h = hashlib.sha1(b'blob %d\0' % os.path.getsize(fp))
+    with open(fp, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def blob_id_or_none(fp):
+    try:
+        return blob_id(fp)
+    except OSError:
+        return None
+
+DEDUP_HEAD = 4096  # Bytes iniciales comparados antes de hashear el archivo completo
+
+def duplicates(paths, max_bytes=MAX_SCAN_BYTES, jobs=1):
+    # ruta -> primera ruta con el mismo contenido. Filtro barato en el proceso principal (tamaño y
+    # primeros 4 KB); solo los candidatos que siguen coincidiendo y son más largos se hashean
+    # completos, en el pool. Se excluyen los binarios por extensión (scan_path no los abre) y los
+    # que pasan del tope (se muestrean, no se leen completos)
+    by_size = {}
+    for fp in paths:
+        if os.path.splitext(fp)[1].lower() in BINARY_EXT:
+            continue
+        try:
+            size = os.path.getsize(fp)
+        except OSError:
+            continue
+        if not max_bytes or size <= max_bytes:
+            by_size.setdefault(size, []).append(fp)
+    groups = {}
+    for size, fps in by_size.items():
+        if len(fps) < 2:
+            continue
+        for fp in fps:
+            try:
+                with open(fp, 'rb') as f:
+                    groups.setdefault((size, hashlib.sha1(f.read(DEDUP_HEAD)).digest()), []).append(fp)
+            except OSError:
+                pass
+    groups = [(key, fps) for key, fps in groups.items() if len(fps) > 1]
+    # Hasta DEDUP_HEAD bytes la cabeza ya es el contenido completo: no hace falta el hash
+    full = [fp for (size, _), fps in groups if size > DEDUP_HEAD for fp in fps]
+    if jobs > 1 and len(full) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(full))) as ex:
+            ids = dict(zip(full, ex.map(blob_id_or_none, full, chunksize=max(1, len(full) // (jobs * 4)))))
+    else:
+        ids = {fp: blob_id_or_none(fp) for fp in full}
+    rep, first = {}, {}
+    for key, fps in groups:
+        for fp in fps:
+            k = key if key[0] <= DEDUP_HEAD else ids[fp]
+            if k is not None:
+                rep[fp] = first.setdefault(k, fp)
+    return {fp: r for fp, r in rep.items() if fp != r}
+
+def unique_results(paths, jobs, max_bytes, oversize, stats):
+    # scan_results escaneando una vez cada contenido repetido: las copias reciben los hallazgos del original
+    rep = duplicates(paths, max_bytes, jobs)
+    stats['duplicates'] += len(rep)
+    shared = set(rep.values())
+    scanned = scan_results([fp for fp in paths if fp not in rep], jobs, max_bytes, oversize)
+    done = {}
+    for fp in paths:
+        if fp in rep:
+            yield (fp, *done[rep[fp]])
+            continue
+        _, kind, findings = next(scanned)
+        if fp in shared:
+            done[fp] = (kind, findings)
+        yield fp, kind, findings
+
+def rules_hash(max_bytes, oversize):
+    # Cambiar reglas, severidades, clasificador u opciones invalida la cache completa
+    spec = [CACHE_VERSION, PATTERNS, sorted(CRITICAL_TYPES), sorted(BINARY_EXT), [m.hex() for m in MAGIC],
+            SNIFF_BYTES, SAMPLE_BYTES, max_bytes, oversize]
+    return hashlib.sha256(json.dumps(spec).encode()).hexdigest()
+
+def load_cache(path, rules):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('rules') == rules:
+            return data['files']
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+    return {}
+
+def save_cache(path, rules, files):
+    # Escritura atómica y solo para el usuario: las entradas contienen fragmentos de secretos
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump({'rules': rules, 'files': files}, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️  No se pudo guardar la cache: {e}")
+
+def fingerprint(fp):
+    try:
+        st = os.stat(fp)
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+
+def cached_results(root, paths, jobs, max_bytes, oversize, cache, stats):
+    # Igual que scan_results, pero los archivos sin cambios se responden desde la cache y solo
+    # el resto se escanea. Al terminar se guardan las entradas vistas bajo root
+    rules = rules_hash(max_bytes, oversize)
+    entries = load_cache(cache, rules)
+    now = time.time_ns()
+    keys = [(os.path.abspath(fp), fingerprint(fp)) for fp in paths]
+    hit = [bool(fpr) and entries.get(key, [None, None])[:2] == fpr for key, fpr in keys]
+    scanned = unique_results([fp for fp, h in zip(paths, hit) if not h], jobs, max_bytes, oversize, stats)
+    prefix = os.path.join(os.path.abspath(root), '')
+    fresh = {k: v for k, v in entries.items() if not k.startswith(prefix)}
+    for fp, (key, fpr), h in zip(paths, keys, hit):
+        if h:
+            stats['cached'] += 1
+            fresh[key] = entries[key]
+            yield fp, entries[key][2], entries[key][3]
+            continue
+        _, kind, findings = next(scanned)
+        if fpr and now - fpr[1] > RACY_NS:
+            fresh[key] = [*fpr, kind, findings]
+        yield fp, kind, findings
+    save_cache(cache, rules, fresh)
+
+def scan_dir(root, out=None, jobs=None, max_bytes=MAX_SCAN_BYTES, oversize='sample', cache=None,
+             coverage=None, aliases=None):
+    # aliases: ruta relativa escaneada -> otras rutas con el mismo contenido que no se descargaron
+    stats = {'duplicates': 0, **({'cached': 0} if cache else {})}
+    jobs = jobs or os.cpu_count() or 1
+    aliases = aliases or {}
+    stats['duplicates'] += sum(map(len, aliases.values()))
+    print(f"🔍 Escaneando: {root}\n" + "-"*80)
+    paths = list(walk_files(root))
+    if cache:
+        results = cached_results(root, paths, jobs, max_bytes, oversize, cache, stats)
+    else:
+        results = unique_results(paths, jobs, max_bytes, oversize, stats)
+    
+    def expanded():
+        for fp, kind, findings in results:
+            rp = os.path.relpath(fp, root)
+            yield rp, kind, findings
+            for alias in aliases.get(rp, ()):
+                yield alias, kind, findings
+    
+    report(expanded(), out, stats, len(paths), coverage)
+
+def report(results, out=None, stats=None, nfiles=None, coverage=None):
+    # Consume (ruta relativa, clase, hallazgos) en orden: consola y reporte JSON
+    res = {}
+    total = 0
+    kinds = {'binary': 0, 'oversize': 0, 'sampled': 0}
+    for rp, kind, findings in results:
+        if kind in kinds:
+            kinds[kind] += 1
+        if findings:
+            res.setdefault(rp, []).extend(findings)  # El historial reporta la misma ruta en varios commits
+            total += len(findings)
+            print(f"⚠️  {rp}")
+            for fi in findings:
+                loc = f"L{fi['line']}" if fi['line'] else f"@{fi['offset']}"
+                if 'commit' in fi:
+                    loc += f" {fi['commit'][:10]} ({fi['author']})"
+                if 'duplicate_of' in fi:
+                    loc += f" = {fi['duplicate_of']}"
+                print(f"  {'🔴' if fi['severity']=='CRITICAL' else '🟠'} [{fi['severity']}] {loc}: {fi['type']}\n     {fi['content'][:80]}")
     print("\n" + "="*80 + f"\n📊 Total: {total} hallazgos en {len(res)} archivos")
+    stats = stats or {}
+    if 'cached' in stats:
+        print(f"   ♻️  Cache: {stats['cached']} de {nfiles} archivos sin cambios")
+    if stats.get('duplicates'):
+        print(f"   🧬 Duplicados: {stats['duplicates']} archivos con contenido repetido escaneados una sola vez")
+    if coverage:
+        print(f"   📋 Cobertura: {coverage['downloaded']} de {coverage['unique']} blobs distintos "
+              f"({coverage['eligible']} archivos elegibles, {coverage['listed']} en el árbol)"
+              f"{'' if coverage['complete'] else ' ⚠️  INCOMPLETA'}")
+    if any(kinds.values()):
+        print(f"   ⏭️  Omitidos: {kinds['binary']} binarios, {kinds['oversize']} grandes │ muestreados (cabeza/cola): {kinds['sampled']}")
     if total > 0:
         crit = sum(1 for v in res.values() for f in v if f['severity']=='CRITICAL')
         print(f"   �� Crítico: {crit}")
     if out or total > 0:
         op = out or 'security-scan-report.json'
         with open(op, 'w') as f:
-            json.dump({'scan_date': datetime.now().isoformat(), 'total': total, 'results': res}, f, indent=2)
+            json.dump({'scan_date': datetime.now().isoformat(), 'total': total, 'results': res,
+                       'skipped': {'binary': kinds['binary'], 'oversize': kinds['oversize']},
+                       'sampled': kinds['sampled'], 'cached': stats.get('cached', 0),
+                       'duplicates': stats.get('duplicates', 0),
+                       **({'coverage': coverage} if coverage else {})}, f, indent=2)
         print(f"✅ Reporte: {op}")
 
+HUNK = re.compile(rb'^@@ -\S+ \+(\d+)')
+ZERO_BLOB = re.compile(rb'^0+$')  # Lado nuevo de un borrado: no es contenido
+C_ESC = re.compile(rb'\\([0-7]{3}|.)')
+C_CHR = {b'a': b'\a', b'b': b'\b', b't': b'\t', b'n': b'\n', b'v': b'\v', b'f': b'\f', b'r': b'\r'}
+
+def diff_path(raw):
+    # Ruta de una cabecera `+++ `: git añade un \t si lleva espacios y entrecomilla al estilo C
+    # (\ooo en octal por byte, \" \\ \t...) las que tienen caracteres de control o comillas
+    name = raw.rstrip(b'\n')
+    if name.endswith(b'\t'):
+        name = name[:-1]
+    if len(name) > 1 and name[:1] == name[-1:] == b'"':
+        name = C_ESC.sub(lambda m: bytes([int(m.group(1), 8)]) if len(m.group(1)) == 3
+                         else C_CHR.get(m.group(1), m.group(1)), name[1:-1])
+    return name.decode('utf-8', 'replace')
+
+def history_results(root, stats):
+    # Recorre `git log -p` en streaming (una línea a la vez): solo las líneas añadidas, con el
+    # número de línea del archivo nuevo, y cada blob una sola vez aunque aparezca en varios commits.
+    # Padres antes que hijos: un blob repetido se atribuye al primer commit que lo introdujo
+    cmd = ['git', '-C', root, '-c', 'core.quotePath=false', 'log', '--all', '--reverse', '--topo-order', '-p',
+           '--no-color', '--no-ext-diff', '--full-index', '--unified=0', '--format=%x00%H%x00%an <%ae>']
+    err = tempfile.TemporaryFile()  # No un pipe: muchos avisos de git bloquearían el proceso
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err)
+    seen = set()  # Blobs ya escaneados: crece por contenido distinto, no por commit
+    found = {}  # blob -> (primera ruta, hallazgos): solo blobs con hallazgos
+    aliased = set()  # (blob, ruta) ya reportados como copia
+    commit = author = path = blob = None
+    findings, hunk, skip, dup, ln = [], False, True, False, 0
+    try:
+        for raw in proc.stdout:
+            if hunk and raw[:1] == b'+':
+                if not skip and (KEYWORDS is None or any(kw in raw.lower() for kw in KEYWORDS)):
+                    stype, line = match_raw(raw[1:])
+                    if stype and 'example' not in line.lower():
+                        findings.append({**finding(ln, stype, line), 'commit': commit, 'author': author})
+                ln += 1
+            elif hunk and raw[:1] in (b'-', b'\\'):
+                continue
+            elif raw.startswith(b'@@ '):
+                m = HUNK.match(raw)
+                hunk, ln = True, int(m.group(1)) if m else 0
+            else:
+                # Cualquier otra línea cierra el archivo anterior
+                hunk = False
+                if findings:
+                    found[blob] = (path, findings)
+                    yield path, 'text', findings
+                    findings = []
+                if raw.startswith(b'\0'):
+                    _, sha, who = raw.rstrip(b'\n').split(b'\0')
+                    commit, author = sha.decode(), who.decode('utf-8', 'replace')
+                    stats['commits'] += 1
+                elif raw.startswith(b'diff --git '):
+                    # Sin línea index (renombrado, modo) no hay contenido nuevo
+                    path, blob, skip, dup = None, None, True, False
+                elif raw.startswith(b'index '):
+                    blob = raw.split()[1].split(b'..')[-1]
+                    if ZERO_BLOB.match(blob):
+                        skip, dup = True, False
+                        continue
+                    skip = dup = blob in seen
+                    stats['duplicates' if dup else 'blobs'] += 1
+                    seen.add(blob)
+                elif raw.startswith(b'+++ '):
+                    name = diff_path(raw[4:])
+                    path = name[2:] if name.startswith('b/') else name
+                    skip = skip or name == '/dev/null' or skip_file(path)
+                    # Blob ya escaneado en otra ruta (copia, restauración): mismos hallazgos en esta
+                    if dup and blob in found and found[blob][0] != path and (blob, path) not in aliased \
+                            and not skip_file(path):
+                        aliased.add((blob, path))
+                        first_path, first = found[blob]
+                        yield path, 'text', [{**fi, 'commit': commit, 'author': author,
+                                              'duplicate_of': f"{fi['commit'][:10]}:{first_path}"} for fi in first]
+        if findings:
+            yield path, 'text', findings
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.terminate()
+        if proc.wait() > 0:
+            err.seek(0)
+            print(f"❌ git log: {err.read().decode('utf-8', 'replace').strip()[-200:]}")  # El error va al final
+            stats['failed'] = True
+        err.close()
+
+def scan_history(root, out=None, **_):
+    # Modo historial para clones locales: los secretos borrados de HEAD siguen en commits anteriores
+    stats = {'commits': 0, 'blobs': 0, 'duplicates': 0, 'failed': False}
+    try:
+        subprocess.run(['git', '-C', root, 'rev-parse', '--git-dir'], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        print(f"❌ Error: {root} no es un clon de git")
+        return False
+    t0 = time.perf_counter()
+    print(f"🕰️  Escaneando historial: {root}\n" + "-"*80)
+    try:
+        report(history_results(root, stats), out, stats)
+    except OSError as e:
+        print(f"❌ Error: {e}")
+        return False
+    print(f"🕰️  Historial: {stats['commits']} commits, {stats['blobs']} blobs escaneados "
+          f"en {time.perf_counter() - t0:.1f}s")
+    return not stats['failed']
+
+DL_WORKERS = 16  # Descargas simultáneas desde GitLab (y tamaño del pool de conexiones)
+TREE_PAGE = 100  # Máximo per_page que acepta GitLab
+
+@functools.lru_cache(maxsize=None)
 def get_token():
+    # Se lee una sola vez por proceso
     for p in ['/home/admin/Documents/GNP/PersonalGitLabToken', os.path.expanduser('~/.gitlab_token')]:
         if os.path.exists(p):
             try:
@@ -79,6 +634,26 @@ def get_token():
                 pass
     return os.environ.get('GITLAB_TOKEN', '')
 
+@functools.lru_cache(maxsize=None)
+def gl_session():
+    # Sesión compartida: conexiones keep-alive reutilizadas por todos los hilos de descarga
+    sess = requests.Session()
+    ad = requests.adapters.HTTPAdapter(pool_connections=DL_WORKERS, pool_maxsize=DL_WORKERS)
+    sess.mount('https://', ad)
+    sess.mount('http://', ad)
+    if get_token():
+        sess.headers['PRIVATE-TOKEN'] = get_token()
+    return sess
+
+def gl_api(base):
+    # API del proyecto en la instancia de la propia URL (gitlab.com o self-hosted)
+    u = urlparse(base)
+    return f"{u.scheme}://{u.netloc}/api/v4/projects/{requests.utils.quote(u.path.strip('/'), safe='')}"
+
+def rate(files, nbytes, t0):
+    dt = max(time.perf_counter() - t0, 1e-6)
+    return f"{files / dt:.1f} archivos/s, {nbytes / dt / 2**20:.2f} MB/s"
+
 def dl_file(url, td):
     try:
         print(f"📥 Descargando: {url}")
@@ -89,14 +664,11 @@ def dl_file(url, td):
             pp = parts[1].split('/', 1)
             branch = pp[0]
             fp = pp[1] if len(pp) > 1 else ''
-            proj = base.replace('https://gitlab.com/', '')
-            ep = requests.utils.quote(proj, safe='')
             ef = requests.utils.quote(fp, safe='')
-            url = f"https://gitlab.com/api/v4/projects/{ep}/repository/files/{ef}/raw?ref={branch}"
+            url = f"{gl_api(base)}/repository/files/{ef}/raw?ref={branch}"
         fn = url.split('/')[-1].split('?')[0] or 'file'
         path = os.path.join(td, fn)
-        h = {'PRIVATE-TOKEN': get_token()} if get_token() else {}
-        r = requests.get(url, headers=h, timeout=30)
+        r = gl_session().get(url, timeout=30)
         r.raise_for_status()
         with open(path, 'wb') as f:
             f.write(r.content)
@@ -106,79 +678,130 @@ def dl_file(url, td):
         print(f"❌ Error: {e}")
         return None
 
+def repo_ref(url):
+    # (URL base del proyecto, ref o None) de una URL de repositorio o de .../-/tree/<ref>/...
+    url = url.split('?')[0]
+    if '/-/tree/' in url:
+        base, rest = url.split('/-/tree/', 1)
+        return base, rest.split('/', 1)[0]
+    return url.replace('.git', ''), None
+
+def scan_archive(url, out=None, max_bytes=MAX_SCAN_BYTES, oversize='sample', **_):
+    # Repositorio completo en una sola petición: el .tar.gz se lee en streaming y cada miembro
+    # se escanea en memoria, sin escribir nada a disco ni topes de archivos/páginas
+    base, ref = repo_ref(url)
+    print(f"📦 Descargando archivo del repositorio{f' ({ref})' if ref else ''}...")
+    t0 = time.perf_counter()
+    
+    def members(tf):
+        for m in tf:
+            if not m.isfile():
+                continue
+            rp = m.name.split('/', 1)[-1]  # Sin el directorio raíz <proyecto>-<ref>-<sha>/
+            if not skip_file(rp):
+                yield (rp, *scan_member(rp, tf.extractfile(m), m.size, max_bytes, oversize))
+    
+    try:
+        r = gl_session().get(f"{gl_api(base)}/repository/archive.tar.gz", params={'sha': ref} if ref else None,
+                             stream=True, timeout=30)
+        r.raise_for_status()
+        print(f"🔍 Escaneando: {url}\n" + "-"*80)
+        with r, tarfile.open(fileobj=r.raw, mode='r|gz') as tf:
+            report(members(tf), out)
+        print(f"📦 Archivo: {r.raw.tell() / 2**20:.1f} MB en {time.perf_counter() - t0:.1f}s")
+        return True
+    except (requests.RequestException, tarfile.TarError, OSError) as e:
+        print(f"❌ Error: {str(e)[:100]}")
+        return False
+
+def tree_pages(sess, api, ref):
+    # Árbol completo con paginación keyset: la página siguiente (Link rel="next") se pide
+    # en segundo plano mientras se procesa la actual
+    params = {'ref': ref, 'recursive': 'true', 'per_page': TREE_PAGE, 'pagination': 'keyset'}
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        fut = ex.submit(sess.get, f"{api}/tree", params=params, timeout=15)
+        while fut:
+            r = fut.result()
+            r.raise_for_status()
+            nxt = r.links.get('next', {}).get('url')
+            fut = ex.submit(sess.get, nxt, timeout=15) if nxt else None
+            yield r.json()
+
 def dl_repo(url, td):
     try:
         print("📦 Accediendo al repositorio...")
-        url = url.split('?')[0]
-        if '/-/tree/' in url:
-            base = url.split('/-/tree/')[0]
-            pp = url.split('/-/tree/')[1].split('/', 1)
-            branch = pp[0]
-        else:
-            base = url.replace('.git', '')
-            branch = 'master'
-        proj = base.replace('https://gitlab.com/', '')
-        ep = requests.utils.quote(proj, safe='')
-        h = {'PRIVATE-TOKEN': get_token()} if get_token() else {}
-        api = f"https://gitlab.com/api/v4/projects/{ep}/repository/tree"
+        base, branch = repo_ref(url)
+        branch = branch or 'master'
+        sess = gl_session()
+        api = f"{gl_api(base)}/repository"
         print("🔍 Listando archivos...")
         
         ext = {'.env', '.yaml', '.yml', '.json', '.py', '.js', '.sh', '.conf', '.xml', '.md', '.sql', '.go', '.java', '.rb', '.properties'}
-        all_f = []
-        pg = 1
-        max_pages = 5  # Limitar a 5 páginas (5000 archivos)
+        cov = {'listed': 0, 'eligible': 0, 'unique': 0, 'downloaded': 0, 'failed': 0, 'complete': True}
+        first = {}  # blob id -> primera ruta con ese contenido
+        aliases = {}  # primera ruta -> demás rutas con el mismo blob (se reportan, no se descargan)
         
-        try:
-            while pg <= max_pages:
-                try:
-                    r = requests.get(api, headers=h, params={'ref': branch, 'recursive': 'true', 'per_page': 1000, 'page': pg}, timeout=15)
-                    if r.status_code != 200:
-                        print(f"⚠️  Página {pg}: Status {r.status_code}")
-                        break
-                    files = r.json()
-                    if not files:
-                        break
-                    # Filtrar solo archivos de interés
+        def eligible():
+            # Filtra cada página mientras la siguiente ya viene en camino; las descargas se encolan al vuelo
+            # y cada blob se pide una sola vez
+            try:
+                for pg, files in enumerate(tree_pages(sess, api, branch), 1):
                     for f in files:
-                        if f['type'] == 'blob':
-                            _, e = os.path.splitext(f['name'])
-                            if e.lower() in ext or not e or f['name'].endswith(('.env', '.cfg', '.conf')):
-                                all_f.append(f)
-                    pg += 1
-                except requests.exceptions.Timeout:
-                    print(f"⚠️  Timeout en página {pg}")
-                    break
-                except Exception as e:
-                    print(f"⚠️  Error página {pg}: {str(e)[:50]}")
-                    break
-        except KeyboardInterrupt:
-            print("\n⚠️  Cancelado por usuario")
-            
-        print(f"✅ {len(all_f)} archivos encontrados")
+                        if f['type'] != 'blob':
+                            continue
+                        cov['listed'] += 1
+                        _, e = os.path.splitext(f['name'])
+                        if e.lower() in ext or not e or f['name'].endswith(('.env', '.cfg', '.conf')):
+                            cov['eligible'] += 1
+                            if f['id'] in first:
+                                aliases.setdefault(os.path.normpath(first[f['id']]), []).append(f['path'])
+                                continue
+                            first[f['id']] = f['path']
+                            cov['unique'] += 1
+                            yield f
+                    if pg % 100 == 0:
+                        print(f"  ⏳ Listados {cov['listed']} archivos...")
+            except (requests.RequestException, ValueError) as e:
+                print(f"⚠️  Listado incompleto: {str(e)[:80]}")
+                cov['complete'] = False
         
-        cnt = 0
-        for i, fi in enumerate(all_f[:500]):  # Máximo 500 archivos
+        def fetch(fi):
+            # Bytes escritos, o None si la descarga falló
             fp = fi['path']
             try:
-                ef = requests.utils.quote(fp, safe='')
-                fu = f"https://gitlab.com/api/v4/projects/{ep}/repository/files/{ef}/raw"
-                fr = requests.get(fu, headers=h, params={'ref': branch}, timeout=5)
-                if fr.status_code == 200:
-                    lp = os.path.join(td, fp)
-                    os.makedirs(os.path.dirname(lp), exist_ok=True)
-                    with open(lp, 'wb') as f:
-                        f.write(fr.content)
-                    cnt += 1
-                    if (i + 1) % 50 == 0:
-                        print(f"  ⏳ Descargados {i + 1} archivos...")
+                fr = sess.get(f"{api}/blobs/{fi['id']}/raw", timeout=5)
+                if fr.status_code != 200:
+                    return None
+                lp = os.path.join(td, fp)
+                os.makedirs(os.path.dirname(lp), exist_ok=True)
+                with open(lp, 'wb') as f:
+                    f.write(fr.content)
+                return len(fr.content)
+            except (requests.RequestException, OSError):
+                return None
+        
+        cnt = nbytes = 0
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=DL_WORKERS) as ex:
+            try:
+                # map() encola todo el árbol (las descargas arrancan durante el listado) antes de devolver
+                done = ex.map(fetch, eligible())
+                print(f"✅ {cov['eligible']} archivos encontrados ({cov['listed']} en el árbol, {cov['unique']} contenidos distintos)")
+                for i, size in enumerate(done, 1):
+                    if size is not None:
+                        cnt += 1
+                        nbytes += size
+                    if i % 50 == 0:
+                        print(f"  ⏳ Descargados {i} archivos... ({rate(cnt, nbytes, t0)})")
             except KeyboardInterrupt:
                 print("\n⚠️  Cancelado por usuario")
-                break
-            except:
-                pass
+                cov['complete'] = False
+                ex.shutdown(wait=False, cancel_futures=True)
         
-        print(f"✅ {cnt} archivos descargados del repositorio")
-        return cnt > 0
+        print(f"✅ {cnt} archivos descargados del repositorio ({rate(cnt, nbytes, t0)})")
+        cov['downloaded'], cov['failed'] = cnt, cov['unique'] - cnt
+        cov['complete'] = cov['complete'] and not cov['failed']
+        return (cov, aliases) if cnt > 0 else None
     except KeyboardInterrupt:
         print("\n⚠️  Cancelado")
         return False
@@ -193,31 +816,44 @@ def is_file_url(u):
     u = u.split('?')[0]
     return '/-/blob/' in u or u.endswith(('.env', '.py', '.sh'))
 
-def process(path, out=None):
-    if is_url(path):
+def process(path, out=None, cache=None, archive=False, history=False, **opts):
+    if history and (is_url(path) or not os.path.isdir(path)):
+        print(f"❌ Error: --history solo aplica a un clon local (directorio): {path}")
+        sys.exit(1)
+    # La cache solo aplica a directorios locales: las descargas van a un temporal distinto cada vez
+    if is_url(path) and archive and not is_file_url(path):
+        if not scan_archive(path, out, **opts):
+            sys.exit(1)
+    elif is_url(path):
         td = tempfile.mkdtemp(prefix='scan_')
         print(f"📁 Temp: {td}\n")
         try:
+            cov = aliases = None
             if is_file_url(path):
                 if not dl_file(path, td):
                     return
             else:
-                if not dl_repo(path, td):
+                got = dl_repo(path, td)
+                if not got:
                     return
-            scan_dir(td, out)
+                cov, aliases = got
+            scan_dir(td, out, coverage=cov, aliases=aliases, **opts)
         finally:
             print("\n🧹 Limpiando...")
             shutil.rmtree(td, ignore_errors=True)
     else:
         # Verificar si es directorio o archivo local
-        if os.path.isdir(path):
+        if os.path.isdir(path) and history:
+            if not scan_history(path, out):
+                sys.exit(1)
+        elif os.path.isdir(path):
             print(f"📂 Analizando directorio: {path}\n")
-            scan_dir(path, out)
+            scan_dir(path, out, cache=cache, **opts)
         elif os.path.isfile(path):
             td = tempfile.mkdtemp(prefix='scan_')
             try:
                 shutil.copy(path, td)
-                scan_dir(td, out)
+                scan_dir(td, out, **opts)
             finally:
                 shutil.rmtree(td, ignore_errors=True)
         else:
@@ -225,8 +861,16 @@ def process(path, out=None):
             sys.exit(1)
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        process(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
-    else:
-        print("Uso: python3 detect-secrets.py <url-o-ruta> [salida.json]")
-        sys.exit(1)
+    ap = argparse.ArgumentParser(usage="python3 detect-secrets.py <url-o-ruta> [salida.json] [--jobs N]")
+    ap.add_argument('path')
+    ap.add_argument('out', nargs='?')
+    ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="Procesos de escaneo (default: núcleos)")
+    ap.add_argument('--max-size', type=float, default=MAX_SCAN_BYTES / 2**20, help="Tope por archivo en MB (0 = sin tope)")
+    ap.add_argument('--oversize', choices=['sample', 'skip'], default='sample', help="Archivos sobre el tope: muestrear cabeza/cola u omitir")
+    ap.add_argument('--archive', action='store_true', help="Repositorio completo vía archive.tar.gz en streaming (una petición, sin temporales)")
+    ap.add_argument('--history', action='store_true', help="Clon local: escanear las líneas añadidas en todo el historial de git")
+    ap.add_argument('--cache', default=CACHE_FILE, help="Cache incremental de escaneos locales")
+    ap.add_argument('--no-cache', action='store_true', help="Escanear todo sin consultar ni guardar la cache")
+    a = ap.parse_args()
+    process(a.path, a.out, cache=None if a.no_cache else a.cache, archive=a.archive, history=a.history,
+            jobs=a.jobs, max_bytes=int(a.max_size * 2**20), oversize=a.oversize)
@@ -39,6 +39,7 @@ def generate_html_report(json_file, output_html=None):
             by_type[secret_type].append({
                 'file': file_path,
                 'line': finding['line'],
+                'offset': finding.get('offset'),
                 'severity': finding['severity'],
                 'preview': finding['content_preview']
             })
@@ -303,13 +304,15 @@ def generate_html_report(json_file, output_html=None):
         
         for item in sorted(items, key=lambda x: (x['severity'], x['file'])):
             severity_class = item['severity'].lower()
+            # Hallazgos en la cola muestreada de archivos grandes: solo se conoce el offset
+            location = f"Línea: {item['line']}" if item['line'] is not None else f"Offset: {item['offset']} bytes"
             html_content += f"""
             <div class="finding {severity_class}">
                 <div class="finding-header">
                     <div class="finding-file">📄 {item['file']}</div>
                     <div class="finding-meta">
                         <span class="finding-type {severity_class}">{item['severity']}</span>
-                        <span>Línea: {item['line']}</span>
+                        <span>{location}</span>
                     </div>
                 </div>
                 <div class="finding-preview">{item['preview']}</div>
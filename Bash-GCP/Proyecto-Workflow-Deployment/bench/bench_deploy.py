@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia de workflow-deploy.py
+===========================================
+Mide tiempos de pared de extremo a extremo sin tocar GCP ni GitLab:
+- gcloud se sustituye por bench/stub-bin/gcloud (inyectado en PATH)
+- GitLab se sustituye por bench/fake_gitlab.py (servidor local)
+
+Escenarios:
+- cold-start   : `workflow-deploy.py --help` (importaciones y arranque)
+- single       : un despliegue completo en un proceso nuevo
+- batch-seq    : N despliegues, un proceso por destino
+- batch-fanout : N destinos en un solo proceso (--project a,b,c...)
+- fases        : desglose en proceso (auth, ubicación, descarga, validación, deploy)
+
+Uso:
+    python3 bench/bench_deploy.py [--targets 4] [--repeat 3]
+                                  [--deploy-delay 1] [--startup-delay 0.3]
+                                  [--gitlab-latency 0.05] [--failure-rate 0]
+                                  [--quota-per-second 0]
+
+Autor: GNP Infrastructure Team
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchlib import PROJECT_DIR, SCRIPT_PATH, STUB_BIN, best_of, load_deploy_module
+from fake_gitlab import start_server
+
+GITLAB_PROJECT = "grupo/proyecto"
+WORKFLOW_PATH = "test-workflow.yaml"
+
+
+def build_env(args: argparse.Namespace) -> dict[str, str]:
+    """Entorno con el stub de gcloud en PATH y un token ficticio."""
+    env = dict(os.environ)
+    env.update({
+        "PATH": f"{STUB_BIN}{os.pathsep}{env.get('PATH', '')}",
+        "GITLAB_TOKEN": "bench-token-0000000000000000",
+        "FAKE_GCLOUD_STARTUP_DELAY": str(args.startup_delay),
+        "FAKE_GCLOUD_DEPLOY_DELAY": str(args.deploy_delay),
+        "FAKE_GCLOUD_FAILURE_RATE": str(args.failure_rate),
+        "FAKE_GCLOUD_QUOTA_PER_SECOND": str(args.quota_per_second),
+    })
+    return env
+
+
+def deploy_argv(gitlab_url: str, projects: list[str]) -> list[str]:
+    """Argumentos de workflow-deploy.py para desplegar en los proyectos dados."""
+    return [
+        "--gitlab-url", gitlab_url,
+        "--gitlab-project", GITLAB_PROJECT,
+        "--path", WORKFLOW_PATH,
+        "--name", "bench-workflow",
+        "--project", ",".join(projects),
+        "--no-cache",
+        "--no-history",
+    ]
+
+
+def run_script(argv: list[str], env: dict[str, str]) -> None:
+    """Ejecuta workflow-deploy.py en un proceso nuevo, descartando la salida."""
+    subprocess.run(
+        [sys.executable, str(SCRIPT_PATH), *argv],
+        env=env,
+        cwd=PROJECT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def measure_phases(gitlab_url: str, env: dict[str, str], projects: list[str]) -> dict[str, float]:
+    """
+    Ejecuta main() en proceso y devuelve los milisegundos por fase del tracer.
+
+    Las fases que corren en hilos (envío y sondeo en un fan-out) suman el
+    tiempo de todos los hilos.
+    """
+    saved_env = dict(os.environ)
+    os.environ.update(env)
+    trace_dir = tempfile.TemporaryDirectory()
+    try:
+        start = time.perf_counter()
+        module = load_deploy_module()
+        import_ms = (time.perf_counter() - start) * 1000
+        logging.getLogger().setLevel(logging.WARNING)
+
+        sys.argv = [
+            "workflow-deploy.py", *deploy_argv(gitlab_url, projects),
+            "--trace-file", os.path.join(trace_dir.name, "trace.json"),
+        ]
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):
+            module.main()
+    finally:
+        trace_dir.cleanup()
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+    return {"import": import_ms, **module.tracer.summary()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de latencia de workflow-deploy.py")
+    parser.add_argument("--targets", type=int, default=4, help="Destinos en los escenarios batch")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--deploy-delay", type=float, default=1.0,
+                        help="Segundos que tarda cada operación de deploy simulada")
+    parser.add_argument("--startup-delay", type=float, default=0.3,
+                        help="Segundos de arranque de cada invocación de gcloud")
+    parser.add_argument("--gitlab-latency", type=float, default=0.05,
+                        help="Segundos de latencia por petición a GitLab")
+    parser.add_argument("--failure-rate", type=int, default=0,
+                        help="Porcentaje de despliegues fallidos (0-100)")
+    parser.add_argument("--quota-per-second", type=int, default=0,
+                        help="Despliegues aceptados por segundo y proyecto/región (0 = sin cuota)")
+    args = parser.parse_args()
+
+    server = start_server(PROJECT_DIR / WORKFLOW_PATH, args.gitlab_latency)
+    env = build_env(args)
+    projects = [f"bench-project-{i}" for i in range(args.targets)]
+
+    scenarios = {
+        "cold-start": lambda: run_script(["--help"], env),
+        "single": lambda: run_script(deploy_argv(server.url, projects[:1]), env),
+        f"batch-seq ({args.targets})": lambda: [
+            run_script(deploy_argv(server.url, [project]), env) for project in projects
+        ],
+        f"batch-fanout ({args.targets})": lambda: run_script(deploy_argv(server.url, projects), env),
+    }
+
+    print(f"gcloud: arranque {args.startup_delay}s, deploy {args.deploy_delay}s, "
+          f"fallos {args.failure_rate}%, cuota {args.quota_per_second or '∞'}/s "
+          f"| GitLab: {args.gitlab_latency}s/petición")
+    print(f"{'escenario':<22} {'mejor de ' + str(args.repeat):>14}")
+    times = {}
+    for name, scenario in scenarios.items():
+        times[name] = best_of(args.repeat, scenario)
+        print(f"{name:<22} {times[name]:>13.3f}s")
+
+    print(f"\nFases (en proceso, {args.targets} destinos):")
+    for phase, ms in measure_phases(server.url, env, projects).items():
+        print(f"  {phase:<24} {ms:>10.1f} ms")
+    print(f"\nPeticiones atendidas por GitLab local: {server.requests}")
+    server.shutdown()
+
+    sequential = times[f"batch-seq ({args.targets})"]
+    fanout = times[f"batch-fanout ({args.targets})"]
+    if fanout > sequential:
+        print(f"✗ El fan-out ({fanout:.3f}s) es más lento que desplegar en serie ({sequential:.3f}s)")
+        sys.exit(1)
+    print(f"✓ Fan-out {sequential / fanout:.1f}x más rápido que en serie")
+
+
+if __name__ == "__main__":
+    main()
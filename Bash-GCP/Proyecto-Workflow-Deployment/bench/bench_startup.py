@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque de workflow-deploy.py
+===========================================
+Usa `python -X importtime` para medir cuánto cuesta cargar el script en las
+rutas que no despliegan nada y detectar regresiones de arranque:
+
+- help      : `workflow-deploy.py --help`
+- arg-error : `workflow-deploy.py` sin argumentos (error de argparse)
+- import    : cargar el módulo sin ejecutar main()
+
+Los módulos que ya carga el intérprete vacío (`python -c pass`, incluido
+site) se descuentan para atribuir al script solo su propio costo.
+
+Uso:
+    python3 bench/bench_startup.py [--repeat 5] [--top 10]
+                                   [--budget-ms 40] [--forbid requests,yaml]
+
+Termina con código 1 si el costo atribuible supera --budget-ms o si algún
+módulo de --forbid se importa en la ruta de --help.
+
+Autor: GNP Infrastructure Team
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+
+from benchlib import PROJECT_DIR, SCRIPT_PATH
+
+DEFAULT_FORBIDDEN = "requests,yaml,subprocess,tempfile,sqlite3,concurrent.futures"
+
+SCENARIOS = {
+    "help": [str(SCRIPT_PATH), "--help"],
+    "arg-error": [str(SCRIPT_PATH)],
+    "import": [
+        "-c",
+        "import importlib.util, sys; "
+        f"spec = importlib.util.spec_from_file_location('workflow_deploy', {str(SCRIPT_PATH)!r}); "
+        "module = importlib.util.module_from_spec(spec); "
+        "sys.modules['workflow_deploy'] = module; "
+        "spec.loader.exec_module(module)",
+    ],
+}
+
+
+def import_times(argv: list[str]) -> dict[str, tuple[int, int]]:
+    """
+    Ejecuta el intérprete con -X importtime y devuelve
+    módulo → (propio µs, acumulado µs) de los módulos de primer nivel y anidados.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def attributable(times: dict[str, tuple[int, int]], baseline: set[str]) -> dict[str, tuple[int, int]]:
+    """Módulos que no carga el intérprete vacío."""
+    return {name: value for name, value in times.items() if name not in baseline}
+
+
+def best_run(argv: list[str], baseline: set[str], repeat: int) -> dict[str, tuple[int, int]]:
+    """Repetición con menor costo atribuible (reduce el ruido de disco y CPU)."""
+    runs = [attributable(import_times(argv), baseline) for _ in range(repeat)]
+    return min(runs, key=lambda times: sum(self_us for self_us, _ in times.values()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de workflow-deploy.py")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Módulos más costosos a mostrar")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Falla si el costo atribuible de --help supera este valor")
+    parser.add_argument("--forbid", default=DEFAULT_FORBIDDEN,
+                        help="Módulos que no deben importarse con --help (separados por coma)")
+    args = parser.parse_args()
+
+    baseline = set(import_times(["-c", "pass"]))
+    forbidden = [name.strip() for name in args.forbid.split(",") if name.strip()]
+
+    print(f"Intérprete vacío: {len(baseline)} módulos (descontados)")
+    print(f"{'escenario':<12} {'módulos':>8} {'ms':>8}")
+    results = {}
+    for scenario, argv in SCENARIOS.items():
+        times = best_run(argv, baseline, args.repeat)
+        results[scenario] = times
+        total_ms = sum(self_us for self_us, _ in times.values()) / 1000
+        print(f"{scenario:<12} {len(times):>8} {total_ms:>8.1f}")
+
+    help_times = results["help"]
+    print("\nMódulos más costosos en --help (propio µs / acumulado µs):")
+    ranked = sorted(help_times.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in ranked[:args.top]:
+        print(f"  {name:<32} {self_us:>8} {cumulative_us:>10}")
+
+    failures = []
+    loaded = [name for name in forbidden if name in help_times]
+    if loaded:
+        failures.append(f"módulos pesados importados con --help: {', '.join(loaded)}")
+    help_ms = sum(self_us for self_us, _ in help_times.values()) / 1000
+    if args.budget_ms is not None and help_ms > args.budget_ms:
+        failures.append(f"--help cuesta {help_ms:.1f} ms (presupuesto {args.budget_ms:.1f} ms)")
+
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print("\n✓ Sin regresiones de arranque")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark de WorkflowValidator
+==============================
+Genera workflows sintéticos grandes (varios MB) y mide por separado:
+- Parseo YAML con SafeLoader (Python puro) vs CSafeLoader (libyaml)
+- Validación semántica completa (steps, next, call, params)
+- Validación repetida servida desde ValidationCache (solo hash)
+
+Uso:
+    python3 bench/bench_validator.py [--sizes 50,200,500] [--repeat 3]
+
+Autor: GNP Infrastructure Team
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from benchlib import best_of, load_deploy_module
+
+
+def generate_workflow(steps_per_workflow: int, subworkflows: int = 20) -> str:
+    """
+    Genera un workflow con 'main' y N subworkflows que usan call, next,
+    switch y try/except, de forma parecida a los workflows generados reales.
+    """
+    lines = ["main:", "  params: [event]", "  steps:"]
+    for i in range(subworkflows):
+        lines += [
+            f"    - llamar_{i}:",
+            f"        call: sub_{i}",
+            "        args:",
+            "          ordenTrabajo: ${event}",
+            f"          nombreCharola: \"Charola {i}\"",
+            f"        result: resultado_{i}",
+        ]
+    lines += ["    - fin:", "        return: ${event}"]
+
+    for i in range(subworkflows):
+        lines += [f"sub_{i}:", "  params: [ordenTrabajo, nombreCharola, {reintentos: 3}]", "  steps:"]
+        for j in range(steps_per_workflow):
+            lines += [
+                f"    - paso_{j}:",
+                "        switch:",
+                f"          - condition: ${{ordenTrabajo.estatus == \"{j}\"}}",
+                f"            next: paso_{(j + 1) % steps_per_workflow}",
+                "          - condition: true",
+                "            steps:",
+                f"              - log_{j}:",
+                "                  call: sys.log",
+                "                  args:",
+                f"                    data: \"Paso {j}: ${{nombreCharola}}\"",
+                "                    severity: \"NOTICE\"",
+                f"              - espera_{j}:",
+                "                  try:",
+                "                    call: http.get",
+                "                    args:",
+                "                      url: https://example.internal/api",
+                "                  except:",
+                "                    as: e",
+                "                    steps:",
+                f"                      - error_{j}:",
+                "                          raise: ${e}",
+            ]
+        lines += ["    - salida:", "        return: ${ordenTrabajo}"]
+    return "\n".join(lines) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de WorkflowValidator")
+    parser.add_argument("--sizes", default="50,200,500",
+                        help="Pasos por subworkflow, separados por coma")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    module = load_deploy_module()
+    validator = module.WorkflowValidator
+    loader = module.yaml_loader()
+    has_c_loader = loader is not yaml.SafeLoader
+
+    print(f"Loader activo: {loader.__name__} (libyaml: {has_c_loader})")
+    print(f"{'pasos':>8} {'MB':>7} {'SafeLoader':>12} {'CSafeLoader':>12} {'validate':>10} {'cache':>9} {'errores':>8}")
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        content = generate_workflow(size)
+        mb = len(content.encode("utf-8")) / 1_000_000
+
+        py_time = best_of(args.repeat, lambda: yaml.load(content, Loader=yaml.SafeLoader))
+        c_time = (
+            best_of(args.repeat, lambda: yaml.load(content, Loader=yaml.CSafeLoader))
+            if has_c_loader else float("nan")
+        )
+        _, errors = validator.validate(content)
+        total = best_of(args.repeat, lambda: validator.validate(content))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = module.ValidationCache(Path(cache_dir))
+            validator.validate(content, cache)
+            cached = best_of(args.repeat, lambda: validator.validate(content, cache))
+
+        print(
+            f"{size:>8} {mb:>7.2f} {py_time:>11.3f}s {c_time:>11.3f}s "
+            f"{total:>9.3f}s {cached:>8.4f}s {len(errors):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
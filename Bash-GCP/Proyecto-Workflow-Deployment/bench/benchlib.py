@@ -0,0 +1,35 @@
+"""
+Utilidades compartidas por los benchmarks de bench/.
+
+Autor: GNP Infrastructure Team
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SCRIPT_PATH = PROJECT_DIR / "workflow-deploy.py"
+STUB_BIN = Path(__file__).resolve().parent / "stub-bin"
+
+
+def load_deploy_module():
+    """Importa workflow-deploy.py (el guion impide un import directo)."""
+    spec = importlib.util.spec_from_file_location("workflow_deploy", SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["workflow_deploy"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def best_of(repeat: int, func) -> float:
+    """Devuelve el mejor tiempo (segundos) de varias repeticiones."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
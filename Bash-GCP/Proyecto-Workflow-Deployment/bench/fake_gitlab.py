@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+GitLab local para benchmarks
+============================
+Servidor HTTP mínimo que imita los endpoints de la API v4 usados por
+workflow-deploy.py, con latencia configurable:
+
+- GET /api/v4/user
+- GET /api/v4/projects/:id/repository/files/:path/raw?ref=REF
+  (con ETag / X-Gitlab-Blob-Id e If-None-Match → 304)
+- GET /api/v4/projects/:id/repository/tree?path=DIR&recursive=true
+  (paginación keyset con page_token y encabezado Link)
+
+Cualquier proyecto y ruta devuelven el mismo archivo fuente. El árbol
+contiene --tree-files workflows bajo workflows/ (más archivos no YAML).
+
+Uso:
+    python3 bench/fake_gitlab.py [--port 8929] [--latency 0.05] [--source test-workflow.yaml]
+                                 [--tree-files 0]
+
+Autor: GNP Infrastructure Team
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse
+
+DEFAULT_SOURCE = Path(__file__).resolve().parent.parent / "test-workflow.yaml"
+
+
+class FakeGitLabHandler(BaseHTTPRequestHandler):
+    """Atiende las peticiones con el contenido y latencia del servidor."""
+
+    server: "FakeGitLabServer"
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+
+        if not self.headers.get("PRIVATE-TOKEN"):
+            self._send_json(401, {"message": "401 Unauthorized"})
+            return
+
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if path == "/api/v4/user":
+            self._send_json(200, {"id": 1, "username": "bench"})
+        elif path.startswith("/api/v4/projects/") and path.endswith("/raw"):
+            self._send_file()
+        elif path.startswith("/api/v4/projects/") and path.endswith("/repository/tree"):
+            self._send_tree(path, parse_qs(parsed.query))
+        else:
+            self._send_json(404, {"message": "404 Not Found"})
+
+    def _send_file(self) -> None:
+        etag = f'"{self.server.blob_id}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        body = self.server.content
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("X-Gitlab-Blob-Id", self.server.blob_id)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_tree(self, path: str, query: dict) -> None:
+        directory = query.get("path", [""])[0].strip("/")
+        per_page = int(query.get("per_page", ["20"])[0])
+        page_token = query.get("page_token", [""])[0]
+
+        prefix = f"{directory}/" if directory else ""
+        entries = [entry for entry in self.server.tree if entry["path"].startswith(prefix)]
+        if directory and not entries:
+            self._send_json(404, {"message": "404 Tree Not Found"})
+            return
+
+        # Keyset: la página empieza después de la última ruta entregada
+        remaining = [entry for entry in entries if entry["path"] > page_token]
+        page = remaining[:per_page]
+
+        headers = {}
+        if len(remaining) > per_page:
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query["page_token"] = page[-1]["path"]
+            headers["Link"] = f'<{self.server.url}{path}?{urlencode(next_query)}>; rel="next"'
+        self._send_json(200, page, headers)
+
+    def _send_json(self, status: int, payload, headers: dict = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # Silencioso: el benchmark imprime sus propios resultados
+
+
+class FakeGitLabServer(ThreadingHTTPServer):
+    """Servidor con el archivo a servir y contador de peticiones."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int, source: Path, latency: float, tree_files: int = 0):
+        super().__init__(("127.0.0.1", port), FakeGitLabHandler)
+        self.content = source.read_bytes()
+        self.blob_id = hashlib.sha1(self.content).hexdigest()
+        self.latency = latency
+        self.requests = 0
+        self.tree = build_tree(tree_files)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def build_tree(tree_files: int) -> list[dict]:
+    """Árbol ordenado por ruta: N workflows en subdirectorios más ruido."""
+    entries = [
+        {"path": "README.md", "type": "blob"},
+        {"path": "workflows", "type": "tree"},
+        {"path": "workflows/notas.txt", "type": "blob"},
+    ]
+    for index in range(tree_files):
+        group = f"workflows/grupo_{index % 3}"
+        entries.append({"path": group, "type": "tree"})
+        entries.append({"path": f"{group}/flujo_{index:03d}.yaml", "type": "blob"})
+    unique = {entry["path"]: entry for entry in entries}
+    return [
+        {"id": hashlib.sha1(path.encode()).hexdigest(), "name": path.rsplit("/", 1)[-1], "mode": "100644", **entry}
+        for path, entry in sorted(unique.items())
+    ]
+
+
+def start_server(
+    source: Path = DEFAULT_SOURCE,
+    latency: float = 0.0,
+    port: int = 0,
+    tree_files: int = 0
+) -> FakeGitLabServer:
+    """Inicia el servidor en un hilo de fondo (port=0 elige uno libre)."""
+    server = FakeGitLabServer(port, source, latency, tree_files)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GitLab local para benchmarks")
+    parser.add_argument("--port", type=int, default=8929)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Segundos de latencia por petición")
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE,
+                        help="Archivo devuelto para cualquier ruta")
+    parser.add_argument("--tree-files", type=int, default=0,
+                        help="Workflows listados bajo workflows/ en el árbol")
+    args = parser.parse_args()
+
+    server = FakeGitLabServer(args.port, args.source, args.latency, args.tree_files)
+    print(f"GitLab local en {server.url} (fuente: {args.source})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
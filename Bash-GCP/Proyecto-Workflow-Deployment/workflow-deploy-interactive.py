@@ -17,9 +17,12 @@ Uso:
 Autor: GNP Infrastructure Team
 """
 
-import subprocess
+import getpass
+import importlib.util
+import logging
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Cargar variables de ambiente desde .env.local
@@ -32,8 +35,20 @@ if env_file.exists():
                 key, value = line.split('=', 1)
                 os.environ[key.strip()] = value.strip().strip('"\'')
 
-# Agregar directorio actual al path para importar workflow-deploy
-sys.path.insert(0, str(Path(__file__).parent))
+def load_deployer():
+    """Importa workflow-deploy.py en este proceso (el guion impide un import directo)."""
+    spec = importlib.util.spec_from_file_location(
+        "workflow_deploy",
+        Path(__file__).parent / "workflow-deploy.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["workflow_deploy"] = module
+    spec.loader.exec_module(module)
+    module.configure_logging()
+    return module
+
+AUTO_LOCATION = "auto"
+PREFETCH_THREAD_PREFIX = "prefetch"
 
 def clear_screen():
     """Limpia la pantalla."""
@@ -128,11 +143,13 @@ def step_1_gitlab_source() -> dict:
     elif choice == "2":
         project = get_input("Proyecto GitLab (ej: grupo/proyecto)")
         branch = get_input("Rama o tag", "main")
+        is_tag = get_input("¿Es un tag? (s/n)", "n").lower().startswith("s")
         file_path = get_input("Ruta del archivo (ej: workflows/workflow.yml)")
         return {
             "type": "components",
             "project": project,
             "branch": branch,
+            "ref_type": "tags" if is_tag else None,
             "file_path": file_path
         }
     else:
@@ -153,8 +170,8 @@ def step_2_gcp_target() -> dict:
     )
     
     location = get_input(
-        "Región de GCP",
-        "us-central1"
+        f"Región de GCP ('{AUTO_LOCATION}' detecta la del workflow existente)",
+        AUTO_LOCATION
     )
     
     return {
@@ -185,7 +202,7 @@ def step_3_options() -> dict:
         "skip_validation": choice in ["3"]
     }
 
-def step_4_preview(gitlab_source: dict, gcp_target: dict, options: dict) -> bool:
+def step_4_preview(gitlab_source: dict, gcp_target: dict, options: dict, prefetcher=None) -> bool:
     """Paso 4: Preview y confirmación."""
     print_header("Paso 4: Confirmación")
     
@@ -202,7 +219,22 @@ def step_4_preview(gitlab_source: dict, gcp_target: dict, options: dict) -> bool
     print(f"\n{Colors.CYAN}Destino (GCP):{Colors.NC}")
     print(f"  {Colors.GRAY}Workflow:{Colors.NC} {gcp_target['workflow_name']}")
     print(f"  {Colors.GRAY}Proyecto:{Colors.NC} {gcp_target['project_id']}")
-    print(f"  {Colors.GRAY}Región:{Colors.NC} {gcp_target['location']}")
+    if gcp_target["location"] != AUTO_LOCATION:
+        print(f"  {Colors.GRAY}Región:{Colors.NC} {gcp_target['location']}")
+    else:
+        detected = prefetcher.location_status(gcp_target) if prefetcher else None
+        if detected:
+            print(f"  {Colors.GRAY}Región:{Colors.NC} {detected} {Colors.GRAY}(detectada){Colors.NC}")
+        else:
+            print(f"  {Colors.GRAY}Región:{Colors.NC} auto-detectar (us-central1 si es nuevo)")
+    
+    if prefetcher:
+        print(f"\n{Colors.CYAN}Archivo (precarga):{Colors.NC}")
+        for line in prefetcher.source_status(gitlab_source):
+            print(f"  {line}")
+        last_deploy = prefetcher.history_status(gitlab_source, gcp_target)
+        if last_deploy:
+            print(f"  {last_deploy}")
     
     print(f"\n{Colors.CYAN}Opciones:{Colors.NC}")
     print(f"  {Colors.GRAY}Modo:{Colors.NC} {'🔸 DRY-RUN' if options['dry_run'] else '✓ Normal'}")
@@ -225,67 +257,265 @@ def step_4_preview(gitlab_source: dict, gcp_target: dict, options: dict) -> bool
     else:
         return False  # Cancelar
 
-def build_command(gitlab_source: dict, gcp_target: dict, options: dict) -> list:
-    """Construye el comando a ejecutar como lista de argumentos (sin shell)."""
-    script_path = str(Path(__file__).parent / "workflow-deploy.py")
-    cmd_parts = [sys.executable, script_path]
-
-    # Fuente GitLab — cada valor como argumento separado, nunca interpolado en string
+def build_source(deployer, gitlab_source: dict):
+    """Convierte la fuente del paso 1 en un GitLabSource (ValueError si la URL es inválida)."""
     if gitlab_source["type"] == "url":
-        cmd_parts.extend(["--url", gitlab_source["url"]])
-    else:
-        cmd_parts.extend(["--gitlab-project", gitlab_source["project"]])
-        cmd_parts.extend(["--branch", gitlab_source["branch"]])
-        cmd_parts.extend(["--path", gitlab_source["file_path"]])
+        return deployer.GitLabURLParser.parse(gitlab_source["url"])
+    return deployer.GitLabSource(
+        project=gitlab_source["project"],
+        branch=gitlab_source["branch"],
+        file_path=gitlab_source["file_path"],
+        ref_type=gitlab_source.get("ref_type")
+    )
 
-    # Destino GCP
-    cmd_parts.extend(["--name", gcp_target["workflow_name"]])
-    cmd_parts.extend(["--project", gcp_target["project_id"]])
-    cmd_parts.extend(["--location", gcp_target["location"]])
+def ask_gitlab_token() -> str:
+    """Pide el token de GitLab sin mostrarlo en pantalla."""
+    while True:
+        token = getpass.getpass(f"{Colors.YELLOW}Token de GitLab{Colors.NC}: ").strip()
+        if token:
+            return token
+        print(f"{Colors.RED}✗ Campo requerido{Colors.NC}")
 
-    # Opciones
-    if options["dry_run"]:
-        cmd_parts.append("--dry-run")
-    if options["skip_validation"]:
-        cmd_parts.append("--skip-validation")
+def create_session(deployer):
+    """
+    Crea la sesión de despliegue que se reutiliza durante todo el modo interactivo.
+    
+    Sin GITLAB_TOKEN ni GITLAB_TOKEN_PATH el token se pide aquí en lugar de
+    abortar el asistente. Devuelve None si el usuario cancela.
+    """
+    try:
+        token = deployer.get_gitlab_token()
+    except SystemExit:
+        try:
+            token = ask_gitlab_token()
+        except (KeyboardInterrupt, EOFError):
+            return None
+    return deployer.DeploymentSession(deployer.DEFAULT_GITLAB_URL, token)
 
-    return cmd_parts
+class Prefetcher:
+    """
+    Descarga, valida y detecta la región en segundo plano mientras el
+    usuario sigue respondiendo el asistente.
+    
+    Cada tarea se indexa por los datos del paso que la originó; si el
+    usuario vuelve atrás y cambia la respuesta, el resultado anterior se
+    descarta y se lanza una tarea nueva.
+    """
+    
+    def __init__(self, deployer, session):
+        self.deployer = deployer
+        self.session = session
+        self._executor = ThreadPoolExecutor(
+            max_workers=2,
+            thread_name_prefix=PREFETCH_THREAD_PREFIX
+        )
+        self._source_task = None    # (clave, future)
+        self._location_task = None  # (clave, future)
+    
+    @staticmethod
+    def _key(data: dict) -> tuple:
+        return tuple(sorted(data.items()))
+    
+    def start_source(self, gitlab_source: dict) -> None:
+        """Lanza descarga + validación para la fuente del paso 1."""
+        key = self._key(gitlab_source)
+        if self._source_task is None or self._source_task[0] != key:
+            self._discard(self._source_task)
+            self._source_task = (key, self._executor.submit(self._fetch_source, gitlab_source))
+    
+    def start_location(self, gcp_target: dict) -> None:
+        """Lanza la detección de región para el destino del paso 2 (si es 'auto')."""
+        if gcp_target["location"] != AUTO_LOCATION:
+            return
+        key = (gcp_target["workflow_name"], gcp_target["project_id"])
+        if self._location_task is None or self._location_task[0] != key:
+            self._location_task = (key, self._executor.submit(
+                self._resolve_location, gcp_target["workflow_name"], gcp_target["project_id"]
+            ))
+    
+    def _fetch_source(self, gitlab_source: dict) -> dict:
+        """
+        Descarga a disco y valida; devuelve un dict con source/file/errores.
+        
+        El WorkflowFile (con su SHA-256) es el mismo que luego se despliega,
+        así que vista previa, cache, historial y despliegue usan un único hash.
+        """
+        try:
+            source = build_source(self.deployer, gitlab_source)
+        except ValueError as e:
+            return {"error": str(e)}
+        if not self.session.authenticate():
+            return {"error": "No se pudo autenticar con GitLab"}
+        workflow_file = self.session.fetch_file(source)
+        if not workflow_file:
+            return {"error": "No se pudo descargar el archivo"}
+        is_valid, errors = self.session.validate(workflow_file)
+        return {
+            "source": source,
+            "file": workflow_file,
+            "lines": self._count_lines(workflow_file),
+            "valid": is_valid,
+            "errors": errors,
+        }
+    
+    def _count_lines(self, workflow_file) -> int:
+        """Líneas del archivo descargado, leyendo por bloques."""
+        with open(workflow_file.path, "rb") as f:
+            chunks = iter(lambda: f.read(self.deployer.STREAM_CHUNK_BYTES), b"")
+            return sum(chunk.count(b"\n") for chunk in chunks) + 1
+    
+    @staticmethod
+    def _discard(task) -> None:
+        """Borra el archivo de una precarga descartada (al terminar, si sigue en curso)."""
+        def cleanup(future) -> None:
+            if not future.cancelled() and future.exception() is None:
+                workflow_file = future.result().get("file")
+                if workflow_file:
+                    workflow_file.cleanup()
+        
+        if task is not None:
+            task[1].add_done_callback(cleanup)
+    
+    def _resolve_location(self, workflow_name: str, project_id: str) -> str:
+        # Consulta directa en este hilo (resolve_targets abre su propio pool, cuyos
+        # logs no se podrían distinguir de los del despliegue); la sesión la reutiliza
+        location = self.deployer.GCPWorkflowDeployer.find_existing_location(workflow_name, project_id)
+        self.session.remember_location(workflow_name, project_id, location)
+        return location or self.deployer.DEFAULT_LOCATION
+    
+    def source_result(self, gitlab_source: dict) -> dict:
+        """Espera y devuelve la precarga de la fuente (la lanza si no existe)."""
+        self.start_source(gitlab_source)
+        return self._source_task[1].result()
+    
+    def source_status(self, gitlab_source: dict) -> list:
+        """Líneas de estado de la precarga, sin bloquear."""
+        task = self._source_task
+        if task is None or task[0] != self._key(gitlab_source):
+            return [f"{Colors.GRAY}Sin precarga{Colors.NC}"]
+        if not task[1].done():
+            return [f"{Colors.GRAY}⏳ Descargando y validando...{Colors.NC}"]
+        
+        result = task[1].result()
+        if "error" in result:
+            return [f"{Colors.RED}✗ {result['error']}{Colors.NC}"]
+        
+        lines = [f"{Colors.GRAY}Descargado:{Colors.NC} {result['lines']} líneas"]
+        if result["valid"]:
+            lines.append(f"{Colors.GREEN}✓ Validación OK{Colors.NC}")
+        else:
+            lines.append(f"{Colors.RED}✗ Validación fallida:{Colors.NC}")
+            lines.extend(f"  {Colors.RED}• {error}{Colors.NC}" for error in result["errors"])
+        return lines
+    
+    def history_status(self, gitlab_source: dict, gcp_target: dict):
+        """Compara el archivo precargado con el último despliegue del historial."""
+        history = self.session.history
+        task = self._source_task
+        if not history or task is None or task[0] != self._key(gitlab_source) or not task[1].done():
+            return None
+        result = task[1].result()
+        if "error" in result:
+            return None
+        
+        location = gcp_target["location"]
+        if location == AUTO_LOCATION:
+            location = self.location_status(gcp_target)
+            if location is None:
+                # Sin región no se compara: podría ser un despliegue en otra región
+                return f"{Colors.GRAY}Último despliegue: ⏳ detectando región...{Colors.NC}"
+        last_hash = history.last_deployed_hash(
+            gcp_target["workflow_name"], gcp_target["project_id"], location
+        )
+        if last_hash is None:
+            return f"{Colors.GRAY}Último despliegue: ninguno registrado{Colors.NC}"
+        if last_hash == self.deployer.DeploymentHistory.content_hash(result["file"]):
+            return f"{Colors.YELLOW}= Sin cambios desde el último despliegue ({last_hash[:12]}){Colors.NC}"
+        return f"{Colors.GRAY}Último despliegue:{Colors.NC} {last_hash[:12]} (el contenido cambió)"
+    
+    def location_status(self, gcp_target: dict):
+        """Región detectada si la tarea ya terminó; None en otro caso."""
+        task = self._location_task
+        key = (gcp_target["workflow_name"], gcp_target["project_id"])
+        if task is None or task[0] != key or not task[1].done():
+            return None
+        try:
+            return task[1].result()
+        except Exception:
+            return None
+    
+    def reset(self) -> None:
+        """Olvida las precargas (nuevo despliegue: el archivo pudo cambiar)."""
+        self._discard(self._source_task)
+        self._source_task = None
+        self._location_task = None
+    
+    def shutdown(self) -> None:
+        self._discard(self._source_task)
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
-def execute_deployment(cmd: list) -> int:
-    """Ejecuta el comando de despliegue sin invocar shell."""
-    print_header("Ejecutando Despliegue")
-    print(f"{Colors.GRAY}Comando:{Colors.NC}")
-    print(f"  {' '.join(cmd)}\n")
+def quiet_background_logging() -> None:
+    """
+    Evita que los logs de los hilos de precarga se impriman en medio de
+    las preguntas; siguen quedando en workflow.log.
+    """
+    def not_prefetch(record: logging.LogRecord) -> bool:
+        return not record.threadName.startswith(PREFETCH_THREAD_PREFIX)
+    
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+            handler.addFilter(not_prefetch)
 
+def execute_deployment(deployer, session, gitlab_source: dict, gcp_target: dict, options: dict, prefetcher=None) -> int:
+    """
+    Ejecuta el despliegue en este mismo proceso.
+    
+    La sesión conserva el cliente GitLab autenticado y las ubicaciones
+    detectadas, así que los despliegues siguientes no repiten ese trabajo.
+    """
+    print_header("Ejecutando Despliegue")
     print(f"{Colors.GRAY}{'─' * 70}{Colors.NC}\n")
 
-    result = subprocess.run(cmd)
+    location = gcp_target["location"]
+    target_specs = [(gcp_target["project_id"], None if location == AUTO_LOCATION else location)]
+
+    try:
+        with deployer.tracer.span("deploy.total"):
+            # Usar la descarga precargada si ya está lista (o esperarla)
+            content = None
+            if prefetcher:
+                prefetched = prefetcher.source_result(gitlab_source)
+                if "error" in prefetched:
+                    raise ValueError(prefetched["error"])
+                # session.run despliega este mismo archivo y lo borra al terminar
+                source, content = prefetched["source"], prefetched["file"]
+            else:
+                source = build_source(deployer, gitlab_source)
+            _, results = session.run(
+                source,
+                gcp_target["workflow_name"],
+                target_specs,
+                dry_run=options["dry_run"],
+                skip_validation=options["skip_validation"],
+                content=content
+            )
+    except ValueError as e:
+        print(f"{Colors.RED}✗ {e}{Colors.NC}")
+        results = []
+    finally:
+        deployer.write_trace(None)
 
     print(f"\n{Colors.GRAY}{'─' * 70}{Colors.NC}\n")
 
-    if result.returncode == 0:
+    if results and all(result.success for result in results):
         print(f"{Colors.GREEN}✓ Despliegue completado exitosamente{Colors.NC}\n")
         return 0
     else:
+        if results:
+            print(f"{Colors.RED}✗ {results[0].message}{Colors.NC}")
         print(f"{Colors.RED}✗ El despliegue finalizó con errores{Colors.NC}\n")
         return 1
 
-def save_to_history(gitlab_source: dict, gcp_target: dict):
-    """Guarda el despliegue en historial."""
-    history_file = Path(__file__).parent / "deployment_history.log"
-    
-    from datetime import datetime
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    entry = f"{timestamp} | {gcp_target['workflow_name']} | {gcp_target['project_id']}\n"
-    
-    try:
-        with open(history_file, "a") as f:
-            f.write(entry)
-    except OSError:
-        pass  # Ignorar errores de escritura
-
 def main():
     """Función principal."""
     clear_screen()
@@ -293,6 +523,16 @@ def main():
     print(f"{Colors.GREEN}║{Colors.NC} {Colors.WHITE}Workflow Deployment Manager - Modo Interactivo{Colors.NC.rjust(46)} {Colors.GREEN}║{Colors.NC}")
     print(f"{Colors.GREEN}╚{'═' * 68}╝{Colors.NC}\n")
     
+    # Una sola importación y sesión GitLab para todos los despliegues
+    deployer = load_deployer()
+    session = create_session(deployer)
+    if session is None:
+        print(f"\n{Colors.YELLOW}Operación cancelada por el usuario{Colors.NC}")
+        return
+    prefetcher = Prefetcher(deployer, session)
+    quiet_background_logging()
+    deployer.tracer.reset()
+    
     step = 1
     gitlab_source = None
     gcp_target = None
@@ -305,10 +545,13 @@ def main():
                 if gitlab_source is None:
                     print(f"{Colors.YELLOW}Despliegue cancelado{Colors.NC}")
                     break
+                # Descargar y validar mientras se completan los pasos siguientes
+                prefetcher.start_source(gitlab_source)
                 step = 2
             
             elif step == 2:
                 gcp_target = step_2_gcp_target()
+                prefetcher.start_location(gcp_target)
                 step = 3
             
             elif step == 3:
@@ -321,15 +564,13 @@ def main():
             
             elif step == 4:
                 clear_screen()
-                result = step_4_preview(gitlab_source, gcp_target, options)
+                result = step_4_preview(gitlab_source, gcp_target, options, prefetcher)
                 
                 if result is True:
-                    # Ejecutar despliegue
-                    cmd = build_command(gitlab_source, gcp_target, options)
-                    exit_code = execute_deployment(cmd)
-                    
-                    if exit_code == 0:
-                        save_to_history(gitlab_source, gcp_target)
+                    # Ejecutar despliegue en proceso, reutilizando la sesión y la precarga
+                    execute_deployment(
+                        deployer, session, gitlab_source, gcp_target, options, prefetcher
+                    )
                     
                     # Preguntar si continuar
                     print_menu({"1": "Nuevo despliegue", "0": "Salir"})
@@ -337,6 +578,8 @@ def main():
                         gitlab_source = None
                         gcp_target = None
                         options = {"dry_run": False, "skip_validation": False}
+                        deployer.tracer.reset()
+                        prefetcher.reset()
                         step = 1
                         clear_screen()
                     else:
@@ -355,6 +598,7 @@ def main():
             print(f"{Colors.RED}✗ Error: {e}{Colors.NC}")
             break
     
+    prefetcher.shutdown()
     print(f"\n{Colors.GRAY}¡Hasta luego!{Colors.NC}\n")
 
 if __name__ == "__main__":
@@ -8,7 +8,9 @@ Características:
 - Descarga automática desde GitLab (ramas o tags)
 - Validación de estructura para GCP Workflows
 - Auto-detección de región para workflows existentes
+- Despliegue de directorios completos (URLs /-/tree/)
 - Modo dry-run para simulación segura
+- Historial indexado (SQLite) con hash del contenido y duraciones
 
 Uso:
     python3 workflow-deploy.py --url URL --name NAME --project PROJECT [opciones]
@@ -18,19 +20,39 @@ Autor: GNP Infrastructure Team
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import json
 import logging
 import os
-import subprocess
+import re
 import sys
-import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
-from urllib.parse import urlparse, unquote
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable, Iterator, Optional
+from urllib.parse import parse_qs, urlparse, unquote
 
-import requests
-import yaml
+# Arranque rápido: requests, yaml, subprocess, tempfile, sqlite3 y
+# concurrent.futures se importan solo en las rutas de código que los usan,
+# de modo que --help o un error de argumentos no pagan su costo.
+if TYPE_CHECKING:
+    import argparse
+    import requests
+    import yaml
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_loader() -> type:
+    """Loader en C (libyaml) cuando está disponible: ~10x más rápido en archivos grandes."""
+    try:
+        from yaml import CSafeLoader as loader
+    except ImportError:  # PyYAML compilado sin libyaml
+        from yaml import SafeLoader as loader
+    return loader
 
 # ============================================================================
 # Cargar variables de ambiente desde .env.local
@@ -52,17 +74,26 @@ LOG_FILE = Path(__file__).parent / "workflow.log"
 LOG_FORMAT = "%(asctime)s │ %(levelname)-5s │ %(message)s"
 LOG_DATE_FORMAT = "%H:%M:%S"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format=LOG_FORMAT,
-    datefmt=LOG_DATE_FORMAT,
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger("workflow-deploy")
 
+
+def configure_logging() -> None:
+    """
+    Configura el log a archivo y a stdout.
+    
+    Se llama después de parsear los argumentos (o al cargar el módulo desde
+    el modo interactivo), no al importar: --help no abre workflow.log.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        datefmt=LOG_DATE_FORMAT,
+        handlers=[
+            logging.FileHandler(LOG_FILE, encoding="utf-8"),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
 # ============================================================================
 # Constantes
 # ============================================================================
@@ -71,6 +102,126 @@ DEFAULT_LOCATION = "us-central1"
 DEFAULT_GITLAB_URL = "https://gitlab.com"
 GCLOUD_TIMEOUT_SECONDS = 120
 GITLAB_TIMEOUT_SECONDS = 15
+POLL_INITIAL_SECONDS = 0.5
+POLL_MAX_SECONDS = 15.0
+POLL_BACKOFF = 2.0
+DEPLOY_MAX_WORKERS = 8
+DEPLOY_RATE_PER_MINUTE = 60     # Tasa inicial por (proyecto, región) tras su primer RESOURCE_EXHAUSTED
+DEPLOY_BURST = 5
+QUOTA_MAX_RETRIES = 6
+QUOTA_MIN_RATE_FACTOR = 1 / 32  # Tasa mínima tras varios RESOURCE_EXHAUSTED
+QUOTA_RECOVERY_FACTOR = 0.1     # Fracción de la tasa inicial sumada por éxito
+QUOTA_ERROR_MARKERS = ("RESOURCE_EXHAUSTED", "Quota exceeded", "Too Many Requests")
+CACHE_DIR = Path(__file__).parent / ".cache"
+TRACE_DIR = Path(__file__).parent / "traces"
+HISTORY_DB = Path(__file__).parent / "deployment_history.db"
+GITLAB_PAGE_SIZE = 100
+STREAM_CHUNK_BYTES = 64 * 1024  # Descarga y copia de archivos por bloques
+OUTPUT_TAIL_LINES = 50          # Líneas de salida de gcloud conservadas para errores
+WORKFLOW_EXTENSIONS = (".yaml", ".yml")
+
+# Nombre de operación de larga duración devuelto por --async
+OPERATION_PATTERN = re.compile(r"projects/[^/\s]+/locations/[^/\s]+/operations/[^\s\]\"']+")
+
+# SHA completo de commit (SHA-1 o SHA-256): referencia inmutable
+COMMIT_SHA_PATTERN = re.compile(r"^(?:[0-9a-f]{40}|[0-9a-f]{64})$")
+
+# Caracteres no permitidos en nombres de workflow de GCP
+WORKFLOW_NAME_INVALID = re.compile(r"[^a-z0-9_-]+")
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Escribe un archivo de forma atómica (archivo temporal + rename)."""
+    if path.exists() and not path.is_file():
+        # Dispositivos o FIFOs (ej. /dev/null): nunca reemplazarlos con rename
+        path.write_text(text, encoding="utf-8")
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# ============================================================================
+# Trazas y Tiempos por Fase
+# ============================================================================
+
+class Tracer:
+    """
+    Registro ligero de spans por fase del despliegue.
+    
+    Exporta en formato Chrome trace (chrome://tracing, Perfetto) y genera
+    un resumen con los milisegundos acumulados por fase. Es seguro entre
+    hilos: los despliegues en paralelo registran cada uno su propio span.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Descarta los spans registrados y reinicia el origen de tiempos."""
+        with self._lock:
+            self._events: list[dict] = []
+            self._origin = time.perf_counter()
+    
+    def record(self, name: str, start: float, end: float, **details) -> None:
+        """Registra un span a partir de marcas de time.perf_counter()."""
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": round((start - self._origin) * 1_000_000),
+            "dur": round((end - start) * 1_000_000),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if details:
+            event["args"] = details
+        with self._lock:
+            self._events.append(event)
+    
+    @contextmanager
+    def span(self, name: str, **details) -> Iterator[None]:
+        """Mide el bloque envuelto como un span con el nombre dado."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), **details)
+    
+    def summary(self) -> dict[str, float]:
+        """Milisegundos acumulados por fase, en orden de primera aparición."""
+        totals: dict[str, float] = {}
+        with self._lock:
+            for event in self._events:
+                totals[event["name"]] = totals.get(event["name"], 0.0) + event["dur"] / 1000
+        return totals
+    
+    def summary_line(self) -> str:
+        """Resumen de una línea para workflow.log."""
+        phases = " | ".join(f"{name}={ms:.0f}" for name, ms in self.summary().items())
+        return f"Fases (ms): {phases}" if phases else "Fases (ms): -"
+    
+    def export(self, path: Path) -> None:
+        """Escribe la traza en formato Chrome trace (JSON)."""
+        with self._lock:
+            payload = {"traceEvents": list(self._events), "displayTimeUnit": "ms"}
+        atomic_write_text(path, json.dumps(payload))
+
+
+tracer = Tracer()
+
+
+def traced(name: str):
+    """Decorador: mide cada llamada a la función como un span del tracer."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
 # ============================================================================
@@ -83,11 +234,99 @@ class GitLabSource:
     project: str
     branch: str
     file_path: str
+    ref_type: Optional[str] = None  # "heads" o "tags" (de ?ref_type=)
+    
+    @property
+    def is_immutable(self) -> bool:
+        """True si la referencia es un tag o un SHA de commit completo."""
+        return self.ref_type == "tags" or bool(COMMIT_SHA_PATTERN.match(self.branch))
     
     def __str__(self) -> str:
         return f"{self.project}@{self.branch}:{self.file_path}"
 
 
+@dataclass
+class WorkflowFile:
+    """
+    Workflow guardado en un archivo temporal, con su SHA-256 y tamaño
+    calculados mientras se escribía. Permite descargar, validar y
+    desplegar sin mantener el contenido completo en memoria.
+    """
+    path: Path
+    sha256: str
+    size: int
+    
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[bytes]) -> WorkflowFile:
+        """Escribe los bloques en un archivo temporal calculando el hash."""
+        import tempfile
+        
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(mode="wb", suffix=".yaml", delete=False) as f:
+            try:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            except BaseException:
+                Path(f.name).unlink(missing_ok=True)
+                raise
+        return cls(Path(f.name), digest.hexdigest(), size)
+    
+    @classmethod
+    def copy_of(cls, path: Path) -> WorkflowFile:
+        """Copia un archivo (ej. de la cache) a un temporal propio."""
+        with open(path, "rb") as f:
+            return cls.from_chunks(iter(functools.partial(f.read, STREAM_CHUNK_BYTES), b""))
+    
+    def read_text(self) -> str:
+        """Contenido completo (solo para rutas que necesitan el texto)."""
+        return self.path.read_text(encoding="utf-8")
+    
+    def cleanup(self) -> None:
+        """Elimina el archivo temporal (ignora errores)."""
+        try:
+            self.path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+@dataclass
+class GitLabTree:
+    """Representa un directorio de GitLab cuyos workflows se despliegan juntos."""
+    project: str
+    branch: str
+    directory: str = ""
+    ref_type: Optional[str] = None
+    
+    def source_for(self, file_path: str) -> GitLabSource:
+        """GitLabSource de un archivo del directorio (misma referencia)."""
+        return GitLabSource(self.project, self.branch, file_path, self.ref_type)
+    
+    def workflow_name(self, file_path: str, prefix: Optional[str] = None) -> str:
+        """
+        Regla de nombres: ruta relativa al directorio sin extensión, en
+        minúsculas, con '/' y caracteres no válidos convertidos a '-'.
+        
+        Ej: directorio 'workflows', 'workflows/emision/alta_poliza.yaml'
+        con prefijo 'danios' → 'danios-emision-alta_poliza'
+        """
+        relative = file_path
+        if self.directory and file_path.startswith(f"{self.directory}/"):
+            relative = file_path[len(self.directory) + 1:]
+        stem = relative.rsplit(".", 1)[0]
+        name = WORKFLOW_NAME_INVALID.sub("-", stem.lower()).strip("-")
+        if prefix:
+            name = f"{prefix}-{name}"
+        if not name[:1].isalpha():
+            name = f"wf-{name}"
+        return name
+    
+    def __str__(self) -> str:
+        return f"{self.project}@{self.branch}:{self.directory or '/'}"
+
+
 @dataclass  
 class DeploymentTarget:
     """Representa el destino del despliegue en GCP."""
@@ -105,6 +344,8 @@ class DeploymentResult:
     success: bool
     message: str
     command: Optional[str] = None
+    operation: Optional[str] = None  # Operación pendiente (modo --async)
+    duration: Optional[float] = None  # Segundos hasta que terminó el despliegue
 
 
 # ============================================================================
@@ -118,26 +359,72 @@ class WorkflowValidator:
     GCP Workflows requiere:
     - Un workflow 'main' como punto de entrada
     - Cada workflow debe tener una lista de 'steps'
+    
+    Además resuelve localmente, en un solo recorrido indexado:
+    - Nombres de pasos (sin duplicados dentro de un workflow)
+    - Saltos 'next' hacia pasos existentes
+    - Llamadas 'call' a subworkflows definidos
+    - Aridad de 'args' contra los 'params' del subworkflow
     """
     
     REQUIRED_ENTRY_POINT = "main"
     
+    # Incrementar al cambiar las reglas: invalida la cache de validación
+    VERSION = "2"
+    
+    # Destinos de 'next' reservados por GCP
+    RESERVED_JUMPS = frozenset({"end", "break", "continue"})
+    
     @classmethod
-    def validate(cls, content: str) -> tuple[bool, list[str]]:
+    @traced("validate")
+    def validate(
+        cls,
+        content: str | WorkflowFile,
+        cache: Optional[ValidationCache] = None
+    ) -> tuple[bool, list[str]]:
         """
         Valida el contenido YAML de un workflow.
         
         Args:
-            content: Contenido YAML del workflow
+            content: Contenido YAML del workflow, o archivo descargado (se
+                     parsea desde disco por bloques, sin leerlo completo)
+            cache: Cache de resultados; si el contenido ya fue validado
+                   con esta versión del validador no se vuelve a parsear
             
         Returns:
             Tupla (es_válido, lista_de_errores)
         """
+        if isinstance(content, WorkflowFile):
+            digest = content.sha256
+        else:
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        
+        cached = cache.get(digest) if cache else None
+        if cached is not None:
+            logger.debug("Validación obtenida de cache")
+            return cached
+        
+        if isinstance(content, WorkflowFile):
+            with open(content.path, "rb") as stream:
+                result = cls._validate_content(stream)
+        else:
+            result = cls._validate_content(content)
+        
+        if cache:
+            cache.put(digest, result)
+        return result
+    
+    @classmethod
+    def _validate_content(cls, content: str | BinaryIO) -> tuple[bool, list[str]]:
+        """Parsea (texto o stream binario) y valida sin consultar la cache."""
         errors: list[str] = []
         
+        import yaml
+        
         # Parsear YAML
         try:
-            data = yaml.safe_load(content)
+            with tracer.span("validate.yaml_parse"):
+                data = yaml.load(content, Loader=yaml_loader())
         except yaml.YAMLError as e:
             return False, [f"Error de sintaxis YAML: {cls._format_yaml_error(e)}"]
         
@@ -154,13 +441,26 @@ class WorkflowValidator:
                 f"Falta el workflow '{cls.REQUIRED_ENTRY_POINT}' "
                 "(punto de entrada requerido por GCP)"
             )
-        else:
-            cls._validate_workflow_structure(data[cls.REQUIRED_ENTRY_POINT], "main", errors)
         
-        # Validar subworkflows
+        # Índice de subworkflows: nombre → (params requeridos, params válidos)
+        signatures = {
+            name: cls._parse_params(workflow.get("params"), name, errors)
+            for name, workflow in data.items()
+            if isinstance(workflow, dict)
+        }
+        
+        main_signature = signatures.get(cls.REQUIRED_ENTRY_POINT)
+        if main_signature and len(main_signature[1]) > 1:
+            errors.append(
+                f"'{cls.REQUIRED_ENTRY_POINT}' acepta como máximo un parámetro"
+            )
+        
+        # Validar cada workflow (main y subworkflows)
         for name, workflow in data.items():
-            if name != cls.REQUIRED_ENTRY_POINT and isinstance(workflow, dict):
+            if isinstance(workflow, dict):
                 cls._validate_workflow_structure(workflow, name, errors)
+                if isinstance(workflow.get("steps"), list):
+                    cls._validate_references(workflow["steps"], name, signatures, errors)
         
         return len(errors) == 0, errors
     
@@ -182,6 +482,162 @@ class WorkflowValidator:
         elif len(workflow["steps"]) == 0:
             errors.append(f"'{name}.steps' no puede estar vacío")
     
+    @staticmethod
+    def _parse_params(
+        params: object,
+        workflow_name: str,
+        errors: list[str]
+    ) -> tuple[frozenset, frozenset]:
+        """
+        Extrae la firma de un workflow a partir de 'params'.
+        
+        Cada parámetro es un nombre (requerido) o un mapa de un solo
+        elemento {nombre: valor_por_defecto} (opcional).
+        
+        Returns:
+            Tupla (params_requeridos, todos_los_params)
+        """
+        if params is None:
+            return frozenset(), frozenset()
+        
+        if not isinstance(params, list):
+            errors.append(f"'{workflow_name}.params' debe ser una lista")
+            return frozenset(), frozenset()
+        
+        required: set[str] = set()
+        accepted: set[str] = set()
+        for param in params:
+            if isinstance(param, str):
+                required.add(param)
+                accepted.add(param)
+            elif isinstance(param, dict) and len(param) == 1:
+                accepted.add(str(next(iter(param))))
+            else:
+                errors.append(f"'{workflow_name}.params' contiene un parámetro inválido: {param!r}")
+        
+        return frozenset(required), frozenset(accepted)
+    
+    @classmethod
+    def _validate_references(
+        cls,
+        steps: list,
+        workflow_name: str,
+        signatures: dict[str, tuple[frozenset, frozenset]],
+        errors: list[str]
+    ) -> None:
+        """
+        Recorre los pasos de un workflow una sola vez, indexando nombres
+        y resolviendo 'next' y 'call' al final del recorrido.
+        """
+        step_names: set[str] = set()
+        jumps: list[tuple[str, str]] = []  # (paso, destino)
+        
+        pending = [steps]
+        while pending:
+            current = pending.pop()
+            for item in current:
+                if not isinstance(item, dict) or len(item) != 1:
+                    errors.append(
+                        f"'{workflow_name}': cada paso debe ser un mapa con un solo nombre"
+                    )
+                    continue
+                
+                step_name, body = next(iter(item.items()))
+                step_name = str(step_name)
+                if step_name in step_names:
+                    errors.append(f"'{workflow_name}': paso duplicado '{step_name}'")
+                step_names.add(step_name)
+                
+                if isinstance(body, dict):
+                    cls._index_step_body(
+                        body, step_name, workflow_name,
+                        signatures, jumps, pending, errors
+                    )
+        
+        for step_name, target in jumps:
+            if target not in step_names and target not in cls.RESERVED_JUMPS:
+                errors.append(
+                    f"'{workflow_name}.{step_name}': 'next' apunta a un paso "
+                    f"inexistente '{target}'"
+                )
+    
+    @classmethod
+    def _index_step_body(
+        cls,
+        body: dict,
+        step_name: str,
+        workflow_name: str,
+        signatures: dict[str, tuple[frozenset, frozenset]],
+        jumps: list[tuple[str, str]],
+        pending: list[list],
+        errors: list[str]
+    ) -> None:
+        """Registra saltos, valida llamadas y encola los pasos anidados de un paso."""
+        location = f"{workflow_name}.{step_name}"
+        
+        target = body.get("next")
+        if isinstance(target, str):
+            jumps.append((step_name, target))
+        
+        call = body.get("call")
+        if isinstance(call, str):
+            cls._validate_call(call, body.get("args"), location, signatures, errors)
+        
+        if isinstance(body.get("steps"), list):
+            pending.append(body["steps"])
+        
+        # switch: cada condición puede tener next, steps o un paso en línea
+        switch = body.get("switch")
+        if isinstance(switch, list):
+            for condition in switch:
+                if isinstance(condition, dict):
+                    cls._index_step_body(
+                        condition, step_name, workflow_name,
+                        signatures, jumps, pending, errors
+                    )
+        
+        # for / try / except / parallel contienen bloques con sus propios pasos
+        for block_key in ("for", "try", "except", "parallel"):
+            block = body.get(block_key)
+            if isinstance(block, dict):
+                cls._index_step_body(
+                    block, step_name, workflow_name,
+                    signatures, jumps, pending, errors
+                )
+        
+        # parallel.branches: lista de ramas con nombre, igual que los pasos
+        if isinstance(body.get("branches"), list):
+            pending.append(body["branches"])
+    
+    @staticmethod
+    def _validate_call(
+        call: str,
+        args: object,
+        location: str,
+        signatures: dict[str, tuple[frozenset, frozenset]],
+        errors: list[str]
+    ) -> None:
+        """Valida que un 'call' apunte a un subworkflow existente con args válidos."""
+        # Las funciones de librería estándar y conectores llevan punto (sys.log, http.get)
+        if "." in call:
+            return
+        
+        if call not in signatures:
+            errors.append(f"'{location}': 'call' a subworkflow inexistente '{call}'")
+            return
+        
+        required, accepted = signatures[call]
+        if args is None:
+            args = {}
+        if not isinstance(args, dict):
+            return  # Expresión dinámica, no se puede resolver localmente
+        
+        passed = {str(key) for key in args}
+        for unknown in sorted(passed - accepted):
+            errors.append(f"'{location}': argumento desconocido '{unknown}' para '{call}'")
+        for missing in sorted(required - passed):
+            errors.append(f"'{location}': falta el argumento requerido '{missing}' para '{call}'")
+    
     @staticmethod
     def _format_yaml_error(error: yaml.YAMLError) -> str:
         """Formatea un error de YAML para mejor legibilidad."""
@@ -191,10 +647,110 @@ class WorkflowValidator:
         return str(error)
 
 
+class ValidationCache:
+    """
+    Cache en disco de resultados de validación.
+    
+    La clave es SHA-256 de la versión del validador más el SHA-256 del
+    contenido, de modo que validar de nuevo un archivo sin cambios cuesta
+    solo el hash (ya calculado durante la descarga en streaming).
+    Cada entrada es un JSON pequeño con el veredicto y los errores.
+    """
+    
+    def __init__(self, cache_dir: Path = CACHE_DIR / "validation"):
+        """
+        Inicializa la cache.
+        
+        Args:
+            cache_dir: Directorio donde se guardan las entradas
+        """
+        self.cache_dir = cache_dir
+    
+    @staticmethod
+    def key(content_sha256: str) -> str:
+        """Calcula la clave de cache para el SHA-256 de un contenido."""
+        raw_key = f"v{WorkflowValidator.VERSION}\0{content_sha256}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+    
+    def get(self, content_sha256: str) -> Optional[tuple[bool, list[str]]]:
+        """Devuelve el resultado guardado o None si no existe."""
+        entry = self.cache_dir / f"{self.key(content_sha256)}.json"
+        try:
+            data = json.loads(entry.read_text(encoding="utf-8"))
+            return bool(data["valid"]), list(data["errors"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def put(self, content_sha256: str, result: tuple[bool, list[str]]) -> None:
+        """Guarda un resultado de forma atómica (ignora errores de escritura)."""
+        is_valid, errors = result
+        entry = self.cache_dir / f"{self.key(content_sha256)}.json"
+        try:
+            atomic_write_text(
+                entry,
+                json.dumps({"valid": is_valid, "errors": errors}, ensure_ascii=False)
+            )
+        except OSError as e:
+            logger.debug(f"No se pudo escribir la cache de validación: {e}")
+
+
 # ============================================================================
 # Cliente GitLab
 # ============================================================================
 
+class GitLabFileCache:
+    """
+    Cache local de archivos descargados de GitLab.
+    
+    Indexada por (instancia, proyecto, ref, ruta). Cada entrada guarda el
+    contenido y los metadatos (ETag, X-Gitlab-Blob-Id) necesarios para
+    revalidar con If-None-Match.
+    """
+    
+    def __init__(self, cache_dir: Path = CACHE_DIR / "gitlab"):
+        """
+        Inicializa la cache.
+        
+        Args:
+            cache_dir: Directorio donde se guardan las entradas
+        """
+        self.cache_dir = cache_dir
+    
+    def _entry(self, base_url: str, source: GitLabSource) -> Path:
+        """Ruta base (sin extensión) de la entrada para una fuente."""
+        raw_key = "\0".join((base_url, source.project, source.branch, source.file_path))
+        return self.cache_dir / hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+    
+    def get(self, base_url: str, source: GitLabSource) -> Optional[tuple[Path, dict]]:
+        """Devuelve (ruta del contenido, metadatos) o None si no hay entrada válida."""
+        entry = self._entry(base_url, source)
+        try:
+            meta = json.loads(entry.with_suffix(".json").read_text(encoding="utf-8"))
+            content_path = entry.with_suffix(".yaml")
+            if not content_path.is_file():
+                return None
+            return content_path, meta
+        except (OSError, ValueError):
+            return None
+    
+    def put(self, base_url: str, source: GitLabSource, file: WorkflowFile, meta: dict) -> None:
+        """Copia el archivo y guarda los metadatos (ignora errores de escritura)."""
+        import shutil
+        
+        entry = self._entry(base_url, source)
+        content_path = entry.with_suffix(".yaml")
+        tmp = content_path.with_name(f"{content_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            # Contenido primero: los metadatos solo existen si el contenido está completo
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file.path, tmp)
+            os.replace(tmp, content_path)
+            atomic_write_text(entry.with_suffix(".json"), json.dumps({**meta, "sha256": file.sha256}))
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            logger.debug(f"No se pudo escribir la cache de GitLab: {e}")
+
+
 class GitLabClient:
     """
     Cliente para interactuar con la API de GitLab.
@@ -203,22 +759,36 @@ class GitLabClient:
     de forma segura y eficiente.
     """
     
-    def __init__(self, base_url: str, token: str):
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        cache: Optional[GitLabFileCache] = None,
+        pool_size: int = DEPLOY_MAX_WORKERS
+    ):
         """
         Inicializa el cliente GitLab.
         
         Args:
             base_url: URL base de GitLab (ej: https://gitlab.com)
             token: Token de acceso personal
+            cache: Cache local de archivos; None desactiva las descargas condicionales
+            pool_size: Conexiones reutilizables (descargas concurrentes)
         """
         self.base_url = base_url.rstrip("/")
-        self._session = self._create_session(token)
+        self._session = self._create_session(token, pool_size)
         self._user_info: Optional[dict] = None
+        self._cache = cache
     
     @staticmethod
-    def _create_session(token: str) -> requests.Session:
+    def _create_session(token: str, pool_size: int = DEPLOY_MAX_WORKERS) -> requests.Session:
         """Crea una sesión HTTP configurada con el token."""
+        import requests
+        
         session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
         session.headers.update({
             "PRIVATE-TOKEN": token,
             "Accept": "application/json",
@@ -226,6 +796,7 @@ class GitLabClient:
         })
         return session
     
+    @traced("gitlab.auth")
     def authenticate(self) -> bool:
         """
         Verifica que el token sea válido.
@@ -233,6 +804,8 @@ class GitLabClient:
         Returns:
             True si el token es válido
         """
+        import requests
+        
         try:
             response = self._session.get(
                 f"{self.base_url}/api/v4/user",
@@ -259,7 +832,10 @@ class GitLabClient:
     
     def download_file(self, source: GitLabSource) -> Optional[str]:
         """
-        Descarga un archivo desde GitLab.
+        Descarga un archivo desde GitLab y devuelve su contenido como texto.
+        
+        Para workflows grandes conviene download_to_file(), que no mantiene
+        el contenido completo en memoria.
         
         Args:
             source: Información del archivo a descargar
@@ -267,6 +843,38 @@ class GitLabClient:
         Returns:
             Contenido del archivo o None si falla
         """
+        file = self.download_to_file(source)
+        if file is None:
+            return None
+        try:
+            return file.read_text()
+        finally:
+            file.cleanup()
+    
+    @traced("gitlab.download")
+    def download_to_file(self, source: GitLabSource) -> Optional[WorkflowFile]:
+        """
+        Descarga un archivo desde GitLab a un archivo temporal, por bloques.
+        
+        El SHA-256 se calcula mientras se escribe, así que la memoria usada
+        no depende del tamaño del workflow. Con cache activa, las referencias
+        inmutables (tags, SHAs) se copian desde disco sin tocar la red, y las
+        ramas se revalidan con If-None-Match (un 304 reutiliza la copia local).
+        
+        Args:
+            source: Información del archivo a descargar
+            
+        Returns:
+            Archivo temporal (el llamador debe llamar a cleanup()) o None si falla
+        """
+        import requests
+        
+        cached = self._cache.get(self.base_url, source) if self._cache else None
+        
+        if cached and source.is_immutable:
+            logger.info(f"Desde cache (ref inmutable): {source.file_path}")
+            return self._from_cache(cached[0])
+        
         # Codificar parámetros para URL
         encoded_project = source.project.replace("/", "%2F")
         encoded_path = source.file_path.replace("/", "%2F")
@@ -276,26 +884,43 @@ class GitLabClient:
             f"/repository/files/{encoded_path}/raw"
         )
         
+        headers = {}
+        if cached and cached[1].get("etag"):
+            headers["If-None-Match"] = cached[1]["etag"]
+        
         try:
-            response = self._session.get(
+            with self._session.get(
                 url,
                 params={"ref": source.branch},
-                timeout=GITLAB_TIMEOUT_SECONDS
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Descargado: {source.file_path}")
-                return response.text
-            
-            if response.status_code == 404:
-                logger.error(
-                    f"Archivo no encontrado: {source.file_path} "
-                    f"(rama: {source.branch})"
-                )
-            else:
-                logger.error(f"Error al descargar (HTTP {response.status_code})")
-            
-            return None
+                headers=headers,
+                timeout=GITLAB_TIMEOUT_SECONDS,
+                stream=True
+            ) as response:
+                if response.status_code == 304 and cached:
+                    logger.info(f"Sin cambios (304), desde cache: {source.file_path}")
+                    return self._from_cache(cached[0])
+                
+                if response.status_code == 200:
+                    file = WorkflowFile.from_chunks(
+                        response.iter_content(chunk_size=STREAM_CHUNK_BYTES)
+                    )
+                    logger.info(f"Descargado: {source.file_path} ({file.size:,} bytes)")
+                    if self._cache:
+                        self._cache.put(self.base_url, source, file, {
+                            "etag": response.headers.get("ETag"),
+                            "blob_id": response.headers.get("X-Gitlab-Blob-Id"),
+                        })
+                    return file
+                
+                if response.status_code == 404:
+                    logger.error(
+                        f"Archivo no encontrado: {source.file_path} "
+                        f"(rama: {source.branch})"
+                    )
+                else:
+                    logger.error(f"Error al descargar (HTTP {response.status_code})")
+                
+                return None
             
         except requests.Timeout:
             logger.error("Timeout al descargar archivo")
@@ -303,12 +928,274 @@ class GitLabClient:
         except requests.RequestException as e:
             logger.error(f"Error de descarga: {e}")
             return None
+        except OSError as e:
+            logger.error(f"No se pudo escribir el archivo temporal: {e}")
+            return None
+    
+    @staticmethod
+    def _from_cache(path: Path) -> Optional[WorkflowFile]:
+        """Copia una entrada de la cache a un temporal propio."""
+        try:
+            return WorkflowFile.copy_of(path)
+        except OSError as e:
+            logger.error(f"No se pudo leer la cache de GitLab: {e}")
+            return None
+    
+    @traced("gitlab.list_tree")
+    def list_tree(
+        self,
+        tree: GitLabTree,
+        extensions: tuple[str, ...] = WORKFLOW_EXTENSIONS
+    ) -> Optional[list[str]]:
+        """
+        Lista de forma recursiva los archivos de un directorio.
+        
+        Recorre todas las páginas siguiendo el encabezado Link (paginación
+        keyset), de modo que directorios grandes se listan completos.
+        
+        Args:
+            tree: Directorio a listar
+            extensions: Extensiones de archivo a conservar
+            
+        Returns:
+            Rutas de los archivos ordenadas, o None si falla
+        """
+        import requests
+        
+        encoded_project = tree.project.replace("/", "%2F")
+        url: Optional[str] = f"{self.base_url}/api/v4/projects/{encoded_project}/repository/tree"
+        params: Optional[dict] = {
+            "ref": tree.branch,
+            "path": tree.directory,
+            "recursive": "true",
+            "pagination": "keyset",
+            "per_page": GITLAB_PAGE_SIZE,
+        }
+        
+        files = []
+        pages = 0
+        try:
+            while url:
+                response = self._session.get(url, params=params, timeout=GITLAB_TIMEOUT_SECONDS)
+                if response.status_code == 404:
+                    logger.error(f"Directorio no encontrado: {tree}")
+                    return None
+                if response.status_code != 200:
+                    logger.error(f"Error al listar el directorio (HTTP {response.status_code})")
+                    return None
+                
+                pages += 1
+                files.extend(
+                    item["path"] for item in response.json()
+                    if item.get("type") == "blob" and item["path"].endswith(extensions)
+                )
+                # La URL de la siguiente página ya incluye todos los parámetros
+                url = response.links.get("next", {}).get("url")
+                params = None
+                
+        except requests.Timeout:
+            logger.error("Timeout al listar el directorio")
+            return None
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Error al listar el directorio: {e}")
+            return None
+        
+        logger.info(f"Directorio {tree}: {len(files)} workflows ({pages} páginas)")
+        return sorted(files)
 
 
 # ============================================================================
 # Desplegador GCP
 # ============================================================================
 
+class TokenBucket:
+    """
+    Token bucket con tasa adaptable (AIMD) para un (proyecto, región).
+    
+    Se crea con el primer RESOURCE_EXHAUSTED del destino, así que arranca
+    vacío. Cada rechazo posterior reduce la tasa a la mitad (hasta un mínimo)
+    y vacía el bucket, lo que da un backoff exponencial natural; cada
+    despliegue exitoso suma una fracción de la tasa inicial, sin techo, para
+    encontrar la cuota real aunque sea mayor que la inicial.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: Tokens por segundo (tasa inicial)
+            capacity: Ráfaga máxima
+        """
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+        self._throttled_at = self._updated  # El rechazo que lo creó
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """Toma un token, esperando si hace falta. Devuelve los segundos esperados."""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+    
+    def throttle(self) -> None:
+        """
+        Cuota agotada: reduce la tasa a la mitad y descarta la ráfaga.
+        
+        Varios rechazos simultáneos (envíos en paralelo) cuentan como uno:
+        la tasa solo se reduce de nuevo tras un intervalo de la tasa actual.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._throttled_at >= 1 / self.rate:
+                self.rate = max(self.base_rate * QUOTA_MIN_RATE_FACTOR, self.rate / 2)
+                self._throttled_at = now
+            self.tokens = min(self.tokens, 0.0)
+    
+    def recover(self) -> None:
+        """Despliegue aceptado: aumento aditivo de la tasa."""
+        with self._lock:
+            self.rate += self.base_rate * QUOTA_RECOVERY_FACTOR
+
+
+class DeployScheduler:
+    """
+    Planificador de despliegues respetando las cuotas de la API de Workflows.
+    
+    Los destinos salen sin límite hasta su primer RESOURCE_EXHAUSTED; desde
+    entonces pasan por un TokenBucket propio. Cada despliegue tiene un único
+    presupuesto de reintentos por cuota, lo rechace la API al enviarlo o al
+    ejecutar la operación (ver retry). Registra la profundidad máxima de la
+    cola, el tiempo total de espera por cuota y los reintentos para el
+    reporte final.
+    """
+    
+    def __init__(
+        self,
+        rate_per_minute: float = DEPLOY_RATE_PER_MINUTE,
+        burst: int = DEPLOY_BURST,
+        max_retries: int = QUOTA_MAX_RETRIES
+    ):
+        """
+        Args:
+            rate_per_minute: Tasa inicial por (proyecto, región) tras su primer rechazo
+            burst: Despliegues que pueden salir de inmediato
+            max_retries: Reintentos por despliegue ante RESOURCE_EXHAUSTED
+        """
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_retries = max_retries
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.max_queue = 0
+        self.throttle_seconds = 0.0
+        self.retries = 0
+    
+    @staticmethod
+    def is_quota_error(result: DeploymentResult) -> bool:
+        """True si el despliegue fue rechazado por cuota."""
+        return not result.success and any(
+            marker in result.message for marker in QUOTA_ERROR_MARKERS
+        )
+    
+    def bucket(self, target: DeploymentTarget) -> Optional[TokenBucket]:
+        """Bucket del (proyecto, región) del destino; None si nunca agotó la cuota."""
+        with self._lock:
+            return self._buckets.get((target.project_id, target.location))
+    
+    def enqueue(self, count: int = 1) -> None:
+        """Registra despliegues que esperan turno (antes de llamar a run)."""
+        with self._lock:
+            self.queued += count
+            self.max_queue = max(self.max_queue, self.queued)
+    
+    def throttle(self, target: DeploymentTarget) -> TokenBucket:
+        """Frena el bucket del destino tras un RESOURCE_EXHAUSTED (lo crea el primero)."""
+        key = (target.project_id, target.location)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.burst)
+                return self._buckets[key]
+            bucket = self._buckets[key]
+        bucket.throttle()
+        return bucket
+    
+    def retry(self, target: DeploymentTarget, result: DeploymentResult, attempts: int) -> bool:
+        """
+        Decide si un despliegue rechazado por cuota vuelve a la cola.
+        
+        Es el único punto que gasta el presupuesto de reintentos: el llamador
+        lleva los envíos hechos por despliegue (attempts) y los pasa aquí.
+        Si devuelve True el despliegue ya está en cola (enqueue).
+        """
+        if not self.is_quota_error(result):
+            return False
+        bucket = self.throttle(target)
+        if attempts > self.max_retries:
+            return False
+        with self._lock:
+            self.retries += 1
+        logger.warning(
+            f"⏳ {target}: cuota agotada, reintento {attempts}/{self.max_retries} "
+            f"(tasa {bucket.rate * 60:.1f}/min)"
+        )
+        self.enqueue()
+        return True
+    
+    def run(
+        self,
+        target: DeploymentTarget,
+        submit: Callable[[], DeploymentResult],
+        attempts: int = 0
+    ) -> tuple[DeploymentResult, int]:
+        """
+        Ejecuta submit cuando la cuota del destino lo permite, reenviando
+        mientras la API responda RESOURCE_EXHAUSTED y quede presupuesto. El
+        despliegue debe estar en cola (enqueue) antes de llamar.
+        
+        Args:
+            target: Destino del despliegue
+            submit: Envío del despliegue
+            attempts: Envíos ya hechos para este despliegue
+            
+        Returns:
+            Resultado del último envío y envíos hechos en total
+        """
+        while True:
+            bucket = self.bucket(target)
+            waited = 0.0
+            if bucket:
+                with tracer.span("quota.wait"):
+                    waited = bucket.acquire()
+            with self._lock:
+                self.queued -= 1
+                self.throttle_seconds += waited
+            
+            result = submit()
+            attempts += 1
+            if result.success and bucket:
+                bucket.recover()
+            if not self.retry(target, result, attempts):
+                return result, attempts
+    
+    def report_line(self) -> str:
+        """Resumen de cuota para el reporte final."""
+        return (
+            f"Cuota: cola máx {self.max_queue} │ espera acumulada {self.throttle_seconds:.1f}s │ "
+            f"reintentos {self.retries}"
+        )
+
+
 class GCPWorkflowDeployer:
     """
     Gestiona el despliegue de workflows en Google Cloud Workflows.
@@ -317,9 +1204,11 @@ class GCPWorkflowDeployer:
     - Auto-detección de región para workflows existentes
     - Manejo seguro de archivos temporales
     - Soporte para modo dry-run
+    - Envío asíncrono (--async) con sondeo concurrente de operaciones
     """
     
     @classmethod
+    @traced("gcp.find_location")
     def find_existing_location(
         cls, 
         workflow_name: str, 
@@ -335,6 +1224,24 @@ class GCPWorkflowDeployer:
         Returns:
             Ubicación del workflow o None si no existe
         """
+        location = (cls.list_workflow_locations(project_id) or {}).get(workflow_name)
+        if location:
+            logger.info(f"Workflow existente en: {location}")
+        return location
+    
+    @staticmethod
+    def list_workflow_locations(project_id: str) -> Optional[dict[str, str]]:
+        """
+        Lista los workflows de un proyecto en todas las regiones.
+        
+        Args:
+            project_id: ID del proyecto GCP
+            
+        Returns:
+            Mapa nombre → ubicación, o None si la consulta falla
+        """
+        import subprocess
+        
         command = [
             "gcloud", "workflows", "list",
             f"--project={project_id}",
@@ -354,49 +1261,81 @@ class GCPWorkflowDeployer:
                 return None
             
             if not result.stdout.strip():
-                return None
+                return {}
             
-            workflows = json.loads(result.stdout)
-            
-            for workflow in workflows:
+            locations = {}
+            for workflow in json.loads(result.stdout):
                 # Formato: projects/PROJECT/locations/LOCATION/workflows/NAME
-                name = workflow.get("name", "")
-                if name.endswith(f"/workflows/{workflow_name}"):
-                    parts = name.split("/")
-                    if len(parts) >= 4:
-                        location = parts[3]
-                        logger.info(f"Workflow existente en: {location}")
-                        return location
-            
-            return None
+                parts = workflow.get("name", "").split("/")
+                if len(parts) >= 6:
+                    locations.setdefault(parts[5], parts[3])
+            return locations
             
         except subprocess.TimeoutExpired:
             logger.debug("Timeout buscando workflow existente")
             return None
-        except (json.JSONDecodeError, subprocess.SubprocessError):
+        except (json.JSONDecodeError, subprocess.SubprocessError, AttributeError):
             return None
     
+    @classmethod
+    def resolve_locations(
+        cls,
+        workflow_name: str,
+        project_ids: list[str],
+        max_workers: int = DEPLOY_MAX_WORKERS
+    ) -> dict[str, Optional[str]]:
+        """
+        Busca en paralelo la ubicación de un workflow en varios proyectos.
+        
+        Args:
+            workflow_name: Nombre del workflow
+            project_ids: IDs de proyectos GCP
+            max_workers: Máximo de consultas simultáneas
+            
+        Returns:
+            Mapa proyecto → ubicación (None si el workflow no existe)
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if not project_ids:
+            return {}
+        
+        workers = max(1, min(max_workers, len(project_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            locations = executor.map(
+                lambda project_id: cls.find_existing_location(workflow_name, project_id),
+                project_ids
+            )
+            return dict(zip(project_ids, locations))
+    
     @classmethod
     def deploy(
         cls,
         target: DeploymentTarget,
-        content: str,
-        dry_run: bool = False
+        content: str | WorkflowFile,
+        dry_run: bool = False,
+        async_submit: bool = False
     ) -> DeploymentResult:
         """
         Despliega un workflow en GCP.
         
         Args:
             target: Configuración del destino
-            content: Contenido YAML del workflow
+            content: Contenido YAML del workflow, o archivo ya descargado
+                     (se pasa tal cual a gcloud, sin copiarlo)
             dry_run: Si es True, solo simula el despliegue
+            async_submit: Si es True, solo envía el despliegue (--async) y
+                          devuelve la operación pendiente en result.operation
             
         Returns:
             Resultado del despliegue
         """
-        # Crear archivo temporal de forma segura
-        temp_file = cls._create_temp_file(content)
-        if not temp_file:
+        if isinstance(content, WorkflowFile):
+            source_file, temp_file = str(content.path), None
+        else:
+            # Crear archivo temporal de forma segura
+            source_file = temp_file = cls._create_temp_file(content)
+        if not source_file:
             return DeploymentResult(
                 success=False,
                 message="Error al crear archivo temporal"
@@ -405,11 +1344,13 @@ class GCPWorkflowDeployer:
         try:
             command = [
                 "gcloud", "workflows", "deploy", target.workflow_name,
-                f"--source={temp_file}",
+                f"--source={source_file}",
                 f"--project={target.project_id}",
                 f"--location={target.location}",
                 "--quiet"
             ]
+            if async_submit:
+                command += ["--async", "--format=json"]
             
             command_str = " ".join(command)
             logger.info(f"Comando: {command_str}")
@@ -422,15 +1363,208 @@ class GCPWorkflowDeployer:
                     command=command_str
                 )
             
+            if async_submit:
+                return cls._submit_deployment(command)
+            
             return cls._execute_deployment(command)
             
         finally:
-            # Limpiar archivo temporal de forma segura
-            cls._cleanup_temp_file(temp_file)
+            # Limpiar archivo temporal de forma segura (el WorkflowFile es del llamador)
+            if temp_file:
+                cls._cleanup_temp_file(temp_file)
+    
+    @classmethod
+    def deploy_concurrently(
+        cls,
+        jobs: list[tuple[DeploymentTarget, str | WorkflowFile]],
+        dry_run: bool = False,
+        max_workers: int = DEPLOY_MAX_WORKERS,
+        scheduler: Optional[DeployScheduler] = None
+    ) -> list[DeploymentResult]:
+        """
+        Envía varios despliegues en modo asíncrono y sondea sus operaciones
+        en paralelo, de modo que N despliegues tardan lo que el más lento.
+        
+        Los envíos pasan por el planificador de cuotas; las operaciones que
+        terminan con RESOURCE_EXHAUSTED se vuelven a enviar en otra ronda con
+        el bucket de su destino frenado. Los rechazos al enviar y al ejecutar
+        gastan el mismo presupuesto por despliegue (DeployScheduler.retry).
+        
+        Args:
+            jobs: Pares (destino, contenido YAML o archivo descargado)
+            dry_run: Si es True, solo simula los despliegues
+            max_workers: Máximo de invocaciones de gcloud simultáneas
+            scheduler: Planificador de cuotas (uno nuevo si es None)
+            
+        Returns:
+            Resultados en el mismo orden que jobs
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        scheduler = scheduler or DeployScheduler()
+        
+        results: list[Optional[DeploymentResult]] = [None] * len(jobs)
+        attempts = [0] * len(jobs)  # Envíos por despliegue: un presupuesto por trabajo
+        
+        def submit(index: int) -> DeploymentResult:
+            target, content = jobs[index]
+            send = lambda: cls.deploy(target, content, dry_run, async_submit=True)
+            if dry_run:
+                return send()
+            result, attempts[index] = scheduler.run(target, send, attempts[index])
+            return result
+        
+        remaining = list(range(len(jobs)))
+        workers = max(1, min(max_workers, len(jobs)))
+        if not dry_run:
+            scheduler.enqueue(len(remaining))
+        
+        while remaining:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                submitted = dict(zip(remaining, executor.map(submit, remaining)))
+            
+            for index, result in submitted.items():
+                results[index] = result
+            pending = {
+                index: (jobs[index][0], result.operation)
+                for index, result in submitted.items()
+                if result.success and result.operation
+            }
+            
+            remaining = []
+            with tracer.span("gcloud.wait_operations", operations=len(pending)):
+                for index, result in cls.wait_for_operations(pending, max_workers):
+                    target = jobs[index][0]
+                    results[index] = result
+                    if result.success:
+                        logger.info(f"✓ {target}: {result.message}")
+                    elif scheduler.retry(target, result, attempts[index]):
+                        # Rechazo de cuota al ejecutar la operación: reenviar en otra ronda
+                        remaining.append(index)
+                    else:
+                        logger.error(f"✗ {target}: {result.message}")
+        
+        return results
+    
+    @classmethod
+    def wait_for_operations(
+        cls,
+        pending: dict,
+        max_workers: int = DEPLOY_MAX_WORKERS
+    ) -> Iterator[tuple[object, DeploymentResult]]:
+        """
+        Sondea operaciones de despliegue hasta que terminen.
+        
+        Cada operación tiene su propio intervalo, que crece de forma
+        exponencial (POLL_INITIAL_SECONDS → POLL_MAX_SECONDS) mientras siga
+        pendiente. El primer sondeo espera POLL_INITIAL_SECONDS: justo
+        después del envío la operación nunca ha terminado y la consulta solo
+        costaría un arranque de gcloud. Los resultados se entregan en cuanto
+        cada una termina.
+        
+        Args:
+            pending: Mapa clave → (destino, nombre de operación)
+            max_workers: Máximo de consultas simultáneas
+            
+        Yields:
+            Pares (clave, resultado) en orden de finalización
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if not pending:
+            return
+        
+        now = time.monotonic()
+        # clave → [siguiente_sondeo, intervalo, inicio]
+        schedule = {
+            key: [now + POLL_INITIAL_SECONDS, POLL_INITIAL_SECONDS * POLL_BACKOFF, now]
+            for key in pending
+        }
+        
+        workers = max(1, min(max_workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while schedule:
+                now = time.monotonic()
+                due = [key for key, slot in schedule.items() if slot[0] <= now]
+                
+                statuses = executor.map(
+                    lambda key: cls._describe_operation(pending[key][1]),
+                    due
+                )
+                for key, status in zip(due, statuses):
+                    slot = schedule[key]
+                    elapsed = time.monotonic() - slot[2]
+                    
+                    if status is not None and status.get("done"):
+                        del schedule[key]
+                        yield key, cls._operation_result(status, elapsed)
+                    elif elapsed > GCLOUD_TIMEOUT_SECONDS:
+                        del schedule[key]
+                        yield key, DeploymentResult(
+                            success=False,
+                            message=f"Timeout: el despliegue excedió {GCLOUD_TIMEOUT_SECONDS}s",
+                            operation=pending[key][1]
+                        )
+                    else:
+                        slot[0] = time.monotonic() + slot[1]
+                        slot[1] = min(slot[1] * POLL_BACKOFF, POLL_MAX_SECONDS)
+                
+                if schedule:
+                    next_poll = min(slot[0] for slot in schedule.values())
+                    time.sleep(max(0.0, next_poll - time.monotonic()))
     
     @staticmethod
+    @traced("gcloud.poll")
+    def _describe_operation(operation: str) -> Optional[dict]:
+        """Consulta el estado de una operación (None si la consulta falla)."""
+        import subprocess
+        
+        command = [
+            "gcloud", "workflows", "operations", "describe", operation,
+            "--format=json",
+            "--quiet"
+        ]
+        try:
+            result = subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+            if result.returncode != 0:
+                logger.debug(f"No se pudo consultar {operation}: {result.stderr.strip()}")
+                return None
+            return json.loads(result.stdout)
+        except (subprocess.SubprocessError, json.JSONDecodeError, OSError):
+            return None
+    
+    @staticmethod
+    def _operation_result(status: dict, elapsed: float) -> DeploymentResult:
+        """Convierte una operación terminada en DeploymentResult."""
+        operation = status.get("name")
+        error = status.get("error")
+        if error:
+            message = str(error.get("message", error))
+            if error.get("code") == 8 and "RESOURCE_EXHAUSTED" not in message:
+                message = f"RESOURCE_EXHAUSTED: {message}"  # código gRPC 8
+            return DeploymentResult(
+                success=False,
+                message=f"Error de la operación: {message}",
+                operation=operation
+            )
+        return DeploymentResult(
+            success=True,
+            message=f"Workflow desplegado exitosamente ({elapsed:.1f}s)",
+            operation=operation,
+            duration=elapsed
+        )
+    
+    @staticmethod
+    @traced("deploy.temp_file")
     def _create_temp_file(content: str) -> Optional[str]:
         """Crea un archivo temporal con el contenido del workflow."""
+        import tempfile
+        
         try:
             with tempfile.NamedTemporaryFile(
                 mode="w",
@@ -452,9 +1586,74 @@ class GCPWorkflowDeployer:
         except OSError:
             pass  # Ignorar errores de limpieza
     
+    @staticmethod
+    @traced("gcloud.submit")
+    def _submit_deployment(command: list[str]) -> DeploymentResult:
+        """Envía el despliegue con --async y extrae el nombre de la operación."""
+        import subprocess
+        
+        try:
+            result = subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                timeout=GCLOUD_TIMEOUT_SECONDS
+            )
+        except subprocess.TimeoutExpired:
+            return DeploymentResult(
+                success=False,
+                message=f"Timeout: el envío excedió {GCLOUD_TIMEOUT_SECONDS}s"
+            )
+        except FileNotFoundError:
+            return DeploymentResult(
+                success=False,
+                message="gcloud CLI no encontrado. Instala Google Cloud SDK."
+            )
+        except subprocess.SubprocessError as e:
+            return DeploymentResult(
+                success=False,
+                message=f"Error de ejecución: {e}"
+            )
+        
+        output = f"{result.stdout}\n{result.stderr}".strip()
+        if result.returncode != 0:
+            return DeploymentResult(
+                success=False,
+                message=f"Error de gcloud: {output or 'Error desconocido'}"
+            )
+        
+        try:
+            operation = json.loads(result.stdout).get("name")
+        except (json.JSONDecodeError, AttributeError):
+            match = OPERATION_PATTERN.search(output)
+            operation = match.group(0) if match else None
+        
+        if not operation:
+            return DeploymentResult(
+                success=False,
+                message=f"No se obtuvo la operación de gcloud: {output}"
+            )
+        
+        logger.info(f"Operación enviada: {operation}")
+        return DeploymentResult(
+            success=True,
+            message="Despliegue enviado",
+            operation=operation
+        )
+    
     @classmethod
     def _execute_deployment(cls, command: list[str]) -> DeploymentResult:
-        """Ejecuta el comando de despliegue."""
+        """
+        Ejecuta el comando de despliegue mostrando la salida en tiempo real.
+        
+        Solo se conservan las últimas OUTPUT_TAIL_LINES líneas para el
+        mensaje de error, así la memoria no crece con la salida de gcloud.
+        """
+        import subprocess
+        from collections import deque
+        
+        start = time.perf_counter()
+        first_output: Optional[float] = None
         try:
             # Ejecutar mostrando salida en tiempo real
             process = subprocess.Popen(
@@ -464,22 +1663,28 @@ class GCPWorkflowDeployer:
                 text=True
             )
             
-            output_lines = []
+            output_tail: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
             for line in process.stdout:
+                if first_output is None:
+                    # Primera salida de gcloud: fin del arranque del CLI
+                    first_output = time.perf_counter()
+                    tracer.record("gcloud.startup", start, first_output)
                 line = line.rstrip()
                 if line:
                     logger.info(f"  {line}")
-                    output_lines.append(line)
+                    output_tail.append(line)
             
             process.wait(timeout=GCLOUD_TIMEOUT_SECONDS)
+            tracer.record("gcloud.operation", first_output or start, time.perf_counter())
             
             if process.returncode == 0:
                 return DeploymentResult(
                     success=True,
-                    message="Workflow desplegado exitosamente"
+                    message="Workflow desplegado exitosamente",
+                    duration=time.perf_counter() - start
                 )
             
-            error_msg = "\n".join(output_lines) or "Error desconocido"
+            error_msg = "\n".join(output_tail) or "Error desconocido"
             return DeploymentResult(
                 success=False,
                 message=f"Error de gcloud: {error_msg}"
@@ -513,8 +1718,43 @@ class GitLabURLParser:
     Soporta formatos:
     - https://gitlab.com/grupo/proyecto/-/blob/rama/ruta/archivo.yml
     - https://gitlab.com/grupo/proyecto/-/blob/tag/archivo.yml?ref_type=tags
+    - https://gitlab.com/grupo/proyecto/-/tree/rama/ruta/directorio (parse_tree)
     """
     
+    @staticmethod
+    def is_tree_url(url: str) -> bool:
+        """True si la URL apunta a un directorio (/-/tree/)."""
+        return "/-/tree/" in url.partition("?")[0]
+    
+    @classmethod
+    def parse_tree(cls, url: str) -> GitLabTree:
+        """
+        Extrae proyecto, referencia y directorio de una URL /-/tree/.
+        
+        Raises:
+            ValueError: Si la URL no tiene el formato esperado
+        """
+        clean_url, _, query = url.partition("?")
+        ref_type = parse_qs(query).get("ref_type", [None])[0]
+        
+        if "/-/tree/" not in clean_url:
+            raise ValueError(
+                "URL inválida. Formato esperado: "
+                "https://gitlab.com/grupo/proyecto/-/tree/rama/directorio"
+            )
+        
+        base, tree_path = clean_url.split("/-/tree/", 1)
+        branch, _, directory = tree_path.strip("/").partition("/")
+        if not branch:
+            raise ValueError("Error parseando URL: falta la rama o tag")
+        
+        return GitLabTree(
+            project=cls._extract_project(base),
+            branch=unquote(branch),
+            directory=unquote(directory),
+            ref_type=ref_type
+        )
+    
     @classmethod
     def parse(cls, url: str) -> GitLabSource:
         """
@@ -529,8 +1769,9 @@ class GitLabURLParser:
         Raises:
             ValueError: Si la URL no tiene el formato esperado
         """
-        # Limpiar query strings
-        clean_url = url.split("?")[0]
+        # Limpiar query strings (conservando ref_type para detectar tags)
+        clean_url, _, query = url.partition("?")
+        ref_type = parse_qs(query).get("ref_type", [None])[0]
         
         # Buscar el separador de blob
         if "/-/blob/" not in clean_url:
@@ -552,7 +1793,8 @@ class GitLabURLParser:
             return GitLabSource(
                 project=project,
                 branch=branch,
-                file_path=file_path
+                file_path=file_path,
+                ref_type=ref_type
             )
             
         except (ValueError, IndexError) as e:
@@ -584,6 +1826,588 @@ class GitLabURLParser:
         return branch, file_path
 
 
+# ============================================================================
+# Historial de Despliegues
+# ============================================================================
+
+@dataclass
+class HistoryEntry:
+    """Un despliegue registrado en el historial."""
+    deployed_at: float
+    workflow_name: str
+    project_id: str
+    location: str
+    source: str
+    content_hash: str
+    success: bool
+    duration: Optional[float]
+    message: str
+
+
+class DeploymentHistory:
+    """
+    Historial local de despliegues en SQLite.
+    
+    Cada despliegue guarda destino, referencia de GitLab, SHA-256 del
+    contenido y duración. El índice por (workflow, proyecto, región, fecha)
+    permite responder "último hash desplegado" sin recorrer el historial.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS deployments (
+            id            INTEGER PRIMARY KEY,
+            deployed_at   REAL    NOT NULL,
+            workflow_name TEXT    NOT NULL,
+            project_id    TEXT    NOT NULL,
+            location      TEXT    NOT NULL,
+            source        TEXT    NOT NULL,
+            content_hash  TEXT    NOT NULL,
+            success       INTEGER NOT NULL,
+            duration      REAL,
+            message       TEXT    NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_deployments_target
+            ON deployments (workflow_name, project_id, location, deployed_at);
+    """
+    
+    def __init__(self, db_path: Path = HISTORY_DB):
+        """
+        Abre (o crea) la base de datos del historial.
+        
+        Args:
+            db_path: Archivo SQLite
+        """
+        import sqlite3
+        
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+    
+    @staticmethod
+    def content_hash(content: str | WorkflowFile) -> str:
+        """SHA-256 del contenido desplegado (ya calculado si es un archivo descargado)."""
+        if isinstance(content, WorkflowFile):
+            return content.sha256
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    def record(
+        self,
+        target: DeploymentTarget,
+        source: GitLabSource,
+        content_hash: str,
+        result: DeploymentResult
+    ) -> None:
+        """Registra el resultado de un despliegue (ignora errores de escritura)."""
+        import sqlite3
+        
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO deployments (deployed_at, workflow_name, project_id, location,"
+                    " source, content_hash, success, duration, message)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        time.time(), target.workflow_name, target.project_id, target.location,
+                        str(source), content_hash, int(result.success), result.duration,
+                        result.message
+                    )
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo registrar el despliegue en el historial: {e}")
+    
+    def last_deployed_hash(
+        self,
+        workflow_name: str,
+        project_id: str,
+        location: Optional[str] = None
+    ) -> Optional[str]:
+        """Hash del último despliegue exitoso del workflow en el proyecto (y región)."""
+        query = (
+            "SELECT content_hash FROM deployments"
+            " WHERE workflow_name = ? AND project_id = ? AND success = 1"
+        )
+        params: list = [workflow_name, project_id]
+        if location:
+            query += " AND location = ?"
+            params.append(location)
+        query += " ORDER BY deployed_at DESC LIMIT 1"
+        
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return row[0] if row else None
+    
+    def recent(
+        self,
+        workflow_name: str,
+        project_id: Optional[str] = None,
+        limit: int = 20
+    ) -> list[HistoryEntry]:
+        """Últimos despliegues de un workflow, del más reciente al más antiguo."""
+        query = (
+            "SELECT deployed_at, workflow_name, project_id, location, source,"
+            " content_hash, success, duration, message"
+            " FROM deployments WHERE workflow_name = ?"
+        )
+        params: list = [workflow_name]
+        if project_id:
+            query += " AND project_id = ?"
+            params.append(project_id)
+        query += " ORDER BY deployed_at DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            HistoryEntry(*row[:6], bool(row[6]), *row[7:])
+            for row in rows
+        ]
+    
+    def close(self) -> None:
+        """Cierra la conexión."""
+        self._conn.close()
+
+
+# ============================================================================
+# Sesión de Despliegue
+# ============================================================================
+
+class DeploymentSession:
+    """
+    Reúne el estado reutilizable entre despliegues de un mismo proceso.
+    
+    Mantiene un GitLabClient autenticado una sola vez, las caches locales y
+    las ubicaciones ya detectadas por (workflow, proyecto), de modo que el
+    modo interactivo puede encadenar despliegues sin relanzar el intérprete.
+    """
+    
+    def __init__(
+        self,
+        gitlab_url: str,
+        token: str,
+        use_cache: bool = True,
+        max_parallel: int = DEPLOY_MAX_WORKERS,
+        use_history: bool = True,
+        deploy_rate: float = DEPLOY_RATE_PER_MINUTE
+    ):
+        """
+        Inicializa la sesión.
+        
+        Args:
+            gitlab_url: URL base de GitLab
+            token: Token de acceso personal
+            use_cache: Usar caches locales de descarga y validación
+            max_parallel: Máximo de operaciones de gcloud simultáneas
+            use_history: Registrar los despliegues en el historial SQLite
+            deploy_rate: Despliegues por minuto por (proyecto, región)
+        """
+        self.gitlab = GitLabClient(
+            gitlab_url,
+            token,
+            cache=GitLabFileCache() if use_cache else None,
+            pool_size=max_parallel
+        )
+        self.validation_cache = ValidationCache() if use_cache else None
+        self.history = DeploymentHistory() if use_history else None
+        self.scheduler = DeployScheduler(deploy_rate)
+        self.max_parallel = max_parallel
+        self._authenticated = False
+        self._locations: dict[tuple[str, str], Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._auth_lock = threading.Lock()
+    
+    def authenticate(self) -> bool:
+        """
+        Autentica con GitLab la primera vez; después reutiliza la sesión.
+        
+        Es seguro llamarlo desde varios hilos (ej. la precarga del modo
+        interactivo y el despliegue): solo uno autentica.
+        """
+        with self._auth_lock:
+            if not self._authenticated:
+                self._authenticated = self.gitlab.authenticate()
+            return self._authenticated
+    
+    def resolve_targets(
+        self,
+        workflow_name: str,
+        target_specs: list[tuple[str, Optional[str]]]
+    ) -> list[DeploymentTarget]:
+        """
+        Construye los destinos, auto-detectando la región donde falte.
+        
+        Las ubicaciones detectadas se recuerdan durante la sesión.
+        """
+        with self._lock:
+            auto_projects = list(dict.fromkeys(
+                project for project, location in target_specs
+                if location is None and (workflow_name, project) not in self._locations
+            ))
+        
+        if auto_projects:
+            logger.info("Buscando workflow existente...")
+            detected = GCPWorkflowDeployer.resolve_locations(
+                workflow_name,
+                auto_projects,
+                self.max_parallel
+            )
+            with self._lock:
+                for project in auto_projects:
+                    self._locations[(workflow_name, project)] = detected[project]
+            for project in auto_projects:
+                if not detected[project]:
+                    logger.info(f"Workflow nuevo en {project} → {DEFAULT_LOCATION}")
+        
+        with self._lock:
+            targets = [
+                DeploymentTarget(
+                    workflow_name=workflow_name,
+                    project_id=project,
+                    location=(
+                        location
+                        or self._locations.get((workflow_name, project))
+                        or DEFAULT_LOCATION
+                    )
+                )
+                for project, location in target_specs
+            ]
+        for target in targets:
+            logger.info(f"Ubicación: {target.project_id}/{target.location}")
+        return targets
+    
+    def remember_location(
+        self,
+        workflow_name: str,
+        project_id: str,
+        location: Optional[str]
+    ) -> None:
+        """Guarda una ubicación ya detectada (None: el workflow no existe)."""
+        with self._lock:
+            self._locations[(workflow_name, project_id)] = location
+    
+    def prime_locations(
+        self,
+        workflow_names: list[str],
+        target_specs: list[tuple[str, Optional[str]]]
+    ) -> None:
+        """
+        Detecta de una vez la región de muchos workflows: una sola consulta
+        'gcloud workflows list' por proyecto en lugar de una por workflow.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        projects = list(dict.fromkeys(
+            project for project, location in target_specs if location is None
+        ))
+        if not projects:
+            return
+        
+        with tracer.span("gcp.list_workflows", projects=len(projects)):
+            workers = max(1, min(self.max_parallel, len(projects)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                listings = dict(zip(
+                    projects,
+                    executor.map(GCPWorkflowDeployer.list_workflow_locations, projects)
+                ))
+        
+        with self._lock:
+            for project, locations in listings.items():
+                if locations is None:
+                    continue  # Consulta fallida: se reintenta por workflow
+                for name in workflow_names:
+                    self._locations.setdefault((name, project), locations.get(name))
+    
+    def fetch(self, source: GitLabSource) -> Optional[str]:
+        """Descarga el archivo fuente desde GitLab."""
+        return self.gitlab.download_file(source)
+    
+    def fetch_file(self, source: GitLabSource) -> Optional[WorkflowFile]:
+        """Descarga el archivo fuente a disco por bloques (memoria constante)."""
+        return self.gitlab.download_to_file(source)
+    
+    def validate(self, content: str | WorkflowFile) -> tuple[bool, list[str]]:
+        """Valida el contenido usando la cache de la sesión."""
+        return WorkflowValidator.validate(content, self.validation_cache)
+    
+    def deploy(
+        self,
+        targets: list[DeploymentTarget],
+        content: str,
+        dry_run: bool = False,
+        async_mode: bool = False
+    ) -> list[DeploymentResult]:
+        """
+        Despliega el mismo contenido en uno o varios destinos.
+        
+        Returns:
+            Resultados en el mismo orden que targets
+        """
+        return self.deploy_jobs([(target, content) for target in targets], dry_run, async_mode)
+    
+    def deploy_jobs(
+        self,
+        jobs: list[tuple[DeploymentTarget, str | WorkflowFile]],
+        dry_run: bool = False,
+        async_mode: bool = False
+    ) -> list[DeploymentResult]:
+        """
+        Despliega pares (destino, contenido), que pueden ser workflows distintos.
+        
+        Un solo trabajo sin async_mode usa el despliegue síncrono; en otro
+        caso se envían en paralelo (hasta max_parallel) y se sondean las
+        operaciones. En ambos casos los envíos respetan las cuotas por
+        (proyecto, región) del planificador de la sesión.
+        
+        Returns:
+            Resultados en el mismo orden que jobs
+        """
+        if len(jobs) == 1 and not async_mode:
+            target, content = jobs[0]
+            send = lambda: GCPWorkflowDeployer.deploy(target, content, dry_run)
+            if dry_run:
+                results = [send()]
+            else:
+                self.scheduler.enqueue()
+                results = [self.scheduler.run(target, send)[0]]
+        else:
+            results = GCPWorkflowDeployer.deploy_concurrently(
+                jobs, dry_run, self.max_parallel, self.scheduler
+            )
+        
+        if not dry_run:
+            with self._lock:
+                for (target, _), result in zip(jobs, results):
+                    if result.success:
+                        self._locations[(target.workflow_name, target.project_id)] = target.location
+        
+        return results
+    
+    def deploy_recorded(
+        self,
+        jobs: list[tuple[DeploymentTarget, GitLabSource, str | WorkflowFile]],
+        dry_run: bool = False,
+        async_mode: bool = False,
+        skip_unchanged: bool = False
+    ) -> list[DeploymentResult]:
+        """
+        Despliega omitiendo (opcionalmente) los destinos sin cambios y
+        registra cada resultado en el historial.
+        
+        Args:
+            jobs: Tríos (destino, fuente, contenido validado)
+            skip_unchanged: Omitir los destinos cuyo último despliegue
+                            exitoso tiene el mismo hash de contenido
+        
+        Returns:
+            Resultados en el mismo orden que jobs
+        """
+        hashes = [DeploymentHistory.content_hash(content) for _, _, content in jobs]
+        unchanged = [
+            skip_unchanged and self.is_unchanged(target, content_hash)
+            for (target, _, _), content_hash in zip(jobs, hashes)
+        ]
+        pending = [index for index, skip in enumerate(unchanged) if not skip]
+        
+        deployed = self.deploy_jobs(
+            [(jobs[index][0], jobs[index][2]) for index in pending],
+            dry_run,
+            async_mode
+        ) if pending else []
+        
+        results = [
+            DeploymentResult(success=True, message="Sin cambios desde el último despliegue (omitido)")
+            for _ in jobs
+        ]
+        for index, result in zip(pending, deployed):
+            results[index] = result
+            if self.history and not dry_run:
+                target, source, _ = jobs[index]
+                self.history.record(target, source, hashes[index], result)
+        return results
+    
+    def is_unchanged(self, target: DeploymentTarget, content_hash: str) -> bool:
+        """True si el último despliegue exitoso del destino ya tiene este contenido."""
+        if not self.history:
+            return False
+        last_hash = self.history.last_deployed_hash(
+            target.workflow_name, target.project_id, target.location
+        )
+        if last_hash != content_hash:
+            return False
+        logger.info(f"= {target}: sin cambios (hash {content_hash[:12]}), se omite")
+        return True
+    
+    def prepare(
+        self,
+        source: GitLabSource,
+        workflow_name: str,
+        target_specs: list[tuple[str, Optional[str]]],
+        skip_validation: bool = False,
+        content: Optional[str | WorkflowFile] = None
+    ) -> tuple[list[DeploymentTarget], Optional[str | WorkflowFile]]:
+        """
+        Resuelve destinos, descarga y valida un workflow.
+        
+        Sin contenido precargado, el archivo se descarga a disco por bloques
+        y se valida y despliega desde ahí; el llamador debe liberar el
+        WorkflowFile devuelto con cleanup().
+        
+        Args:
+            content: Contenido o archivo ya descargado de source (omite la
+                     descarga; un WorkflowFile pasa a ser de la sesión)
+        
+        Returns:
+            Tupla (destinos, contenido); contenido None si la descarga o la
+            validación fallaron (los errores ya quedan en el log)
+        """
+        # Auto-detectar ubicación donde no se especificó (en paralelo por proyecto)
+        targets = self.resolve_targets(workflow_name, target_specs)
+        
+        # Descargar archivo (salvo que ya venga precargado)
+        if content is None:
+            content = self.fetch_file(source)
+        if not content:
+            return targets, None
+        
+        # Validar workflow
+        if not skip_validation:
+            is_valid, errors = self.validate(content)
+            if not is_valid:
+                logger.error(f"Validación fallida ({source.file_path}):")
+                for error in errors:
+                    logger.error(f"  • {error}")
+                if isinstance(content, WorkflowFile):
+                    content.cleanup()
+                return targets, None
+            logger.info(f"✓ Validación OK ({source.file_path})")
+        else:
+            logger.info("⚠ Validación omitida")
+        
+        return targets, content
+    
+    def run(
+        self,
+        source: GitLabSource,
+        workflow_name: str,
+        target_specs: list[tuple[str, Optional[str]]],
+        dry_run: bool = False,
+        skip_validation: bool = False,
+        async_mode: bool = False,
+        content: Optional[str | WorkflowFile] = None,
+        skip_unchanged: bool = False
+    ) -> tuple[list[DeploymentTarget], list[DeploymentResult]]:
+        """
+        Ejecuta el flujo completo: ubicación, descarga, validación y despliegue.
+        
+        Args:
+            content: Contenido o archivo ya descargado de source (omite la
+                     descarga; un WorkflowFile se borra al terminar)
+            skip_unchanged: Omitir los destinos cuyo último despliegue
+                            exitoso tiene el mismo hash de contenido
+        
+        Returns:
+            Tupla (destinos, resultados); resultados vacío si el flujo se
+            detuvo antes de desplegar (los errores ya quedan en el log)
+        """
+        if not self.authenticate():
+            if isinstance(content, WorkflowFile):
+                content.cleanup()
+            return [], []
+        
+        targets, content = self.prepare(
+            source, workflow_name, target_specs, skip_validation, content
+        )
+        if content is None:
+            return targets, []
+        
+        try:
+            return targets, self.deploy_recorded(
+                [(target, source, content) for target in targets],
+                dry_run,
+                async_mode,
+                skip_unchanged
+            )
+        finally:
+            if isinstance(content, WorkflowFile):
+                content.cleanup()
+    
+    def run_tree(
+        self,
+        tree: GitLabTree,
+        target_specs: list[tuple[str, Optional[str]]],
+        name_prefix: Optional[str] = None,
+        dry_run: bool = False,
+        skip_validation: bool = False,
+        async_mode: bool = False,
+        skip_unchanged: bool = False
+    ) -> tuple[list[DeploymentTarget], list[DeploymentResult]]:
+        """
+        Despliega todos los workflows de un directorio de GitLab.
+        
+        Pipeline acotado: hasta max_parallel archivos se descargan y
+        validan a la vez; después todos los pares (workflow, destino)
+        válidos se despliegan juntos con el mismo límite de concurrencia.
+        Los archivos que no se pudieron descargar o validar aparecen como
+        resultados fallidos en sus destinos.
+        
+        Returns:
+            Tupla (destinos, resultados) de todos los workflows; vacía si
+            falló la autenticación o el listado
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if not self.authenticate():
+            return [], []
+        
+        files = self.gitlab.list_tree(tree)
+        if not files:
+            if files is not None:
+                logger.error(f"No hay workflows ({', '.join(WORKFLOW_EXTENSIONS)}) en {tree}")
+            return [], []
+        
+        names = [tree.workflow_name(file_path, name_prefix) for file_path in files]
+        duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+        if duplicates:
+            logger.error(f"La regla de nombres produce workflows duplicados: {', '.join(duplicates)}")
+            return [], []
+        
+        self.prime_locations(names, target_specs)
+        
+        def prepare_file(job: tuple[str, str]):
+            file_path, workflow_name = job
+            source = tree.source_for(file_path)
+            targets, content = self.prepare(source, workflow_name, target_specs, skip_validation)
+            return source, targets, content
+        
+        workers = max(1, min(self.max_parallel, len(files)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            prepared = list(executor.map(prepare_file, zip(files, names)))
+        
+        jobs = [
+            (target, source, content)
+            for source, targets, content in prepared if content is not None
+            for target in targets
+        ]
+        try:
+            deployed = iter(self.deploy_recorded(jobs, dry_run, async_mode, skip_unchanged))
+        finally:
+            for _, _, content in prepared:
+                if content is not None:
+                    content.cleanup()
+        
+        all_targets, results = [], []
+        for source, targets, content in prepared:
+            for target in targets:
+                all_targets.append(target)
+                results.append(
+                    next(deployed) if content is not None else DeploymentResult(
+                        success=False,
+                        message=f"Descarga o validación fallida: {source.file_path}"
+                    )
+                )
+        return all_targets, results
+
+
 # ============================================================================
 # Función Principal
 # ============================================================================
@@ -609,6 +2433,17 @@ Ejemplos:
   # Simulación (dry-run)
   %(prog)s --url "..." --name workflow --project proj --dry-run
 
+  # Varios proyectos × regiones (descarga y valida una sola vez)
+  %(prog)s --url "..." --name workflow \\
+           --project proj-dev,proj-qa --location us-central1,us-east1
+
+  # Todos los *.yaml de un directorio (nombre = prefijo + ruta relativa)
+  %(prog)s --url "https://gitlab.com/org/repo/-/tree/main/workflows" \\
+           --name danios --project gcp-project
+
+  # Historial y duraciones de un workflow
+  %(prog)s --history --name workflow [--project proj]
+
 Variables de entorno:
   GITLAB_TOKEN    Token de acceso personal de GitLab (requerido)
         """
@@ -619,13 +2454,18 @@ Variables de entorno:
     source.add_argument(
         "--url",
         metavar="URL",
-        help="URL completa del archivo en GitLab"
+        help="URL completa del archivo (/-/blob/) o directorio (/-/tree/) en GitLab"
     )
     source.add_argument(
         "--gitlab-project",
         metavar="PROYECTO",
         help="Proyecto GitLab (formato: grupo/proyecto)"
     )
+    source.add_argument(
+        "--history",
+        action="store_true",
+        help="Mostrar el historial y las duraciones de --name (no despliega)"
+    )
     
     # Parámetros de fuente adicionales
     parser.add_argument(
@@ -634,6 +2474,11 @@ Variables de entorno:
         metavar="RAMA",
         help="Rama o tag (default: main)"
     )
+    parser.add_argument(
+        "--ref-type",
+        choices=["heads", "tags"],
+        help="Tipo de referencia; 'tags' permite servir el archivo desde cache"
+    )
     parser.add_argument(
         "--path",
         metavar="RUTA",
@@ -643,20 +2488,44 @@ Variables de entorno:
     # Destino GCP
     parser.add_argument(
         "--name", "-n",
-        required=True,
         metavar="NOMBRE",
-        help="Nombre del workflow en GCP"
+        help="Nombre del workflow en GCP (con URLs /-/tree/: prefijo opcional)"
     )
     parser.add_argument(
         "--project", "-p",
-        required=True,
+        action="append",
         metavar="PROYECTO",
-        help="ID del proyecto en GCP"
+        help="ID del proyecto en GCP (repetible o separado por comas)"
     )
     parser.add_argument(
         "--location", "-l",
+        action="append",
         metavar="REGION",
-        help="Región de GCP (auto-detecta si el workflow existe)"
+        help="Región de GCP (repetible; auto-detecta si el workflow existe)"
+    )
+    parser.add_argument(
+        "--target", "-t",
+        action="append",
+        metavar="PROYECTO[:REGION]",
+        help="Destino adicional (repetible o separado por comas)"
+    )
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=DEPLOY_MAX_WORKERS,
+        metavar="N",
+        help=f"Despliegues simultáneos con varios destinos (default: {DEPLOY_MAX_WORKERS})"
+    )
+    parser.add_argument(
+        "--deploy-rate",
+        type=float,
+        default=DEPLOY_RATE_PER_MINUTE,
+        metavar="N",
+        help=(
+            "Despliegues por minuto por proyecto/región a partir de su primer "
+            "RESOURCE_EXHAUSTED; hasta entonces sin límite. Luego baja a la mitad "
+            f"con cada rechazo y sube con cada éxito (default: {DEPLOY_RATE_PER_MINUTE})"
+        )
     )
     
     # Opciones
@@ -670,6 +2539,32 @@ Variables de entorno:
         action="store_true",
         help="Omitir validación del workflow"
     )
+    parser.add_argument(
+        "--async",
+        dest="async_mode",
+        action="store_true",
+        help="Enviar con 'gcloud --async' y sondear la operación hasta que termine"
+    )
+    parser.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="Omitir destinos cuyo último despliegue exitoso tiene el mismo contenido"
+    )
+    parser.add_argument(
+        "--no-history",
+        action="store_true",
+        help="No registrar el despliegue en el historial local"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="No usar la cache local (validación y descargas de GitLab)"
+    )
+    parser.add_argument(
+        "--trace-file",
+        metavar="RUTA",
+        help="Archivo de traza JSON (Chrome trace; default: traces/trace-*.json)"
+    )
     parser.add_argument(
         "--gitlab-url",
         default=DEFAULT_GITLAB_URL,
@@ -725,7 +2620,66 @@ def get_gitlab_token() -> str:
     return token
 
 
-def print_header(source: GitLabSource, target: DeploymentTarget, dry_run: bool) -> None:
+def split_values(values: Optional[list[str]]) -> list[str]:
+    """Aplana argumentos repetibles que además aceptan listas con comas."""
+    return [
+        item.strip()
+        for value in values or []
+        for item in value.split(",")
+        if item.strip()
+    ]
+
+
+def parse_target_specs(args: 'argparse.Namespace') -> list[tuple[str, Optional[str]]]:
+    """
+    Construye la lista de destinos (proyecto, región) sin duplicados.
+    
+    --project × --location forman un producto cartesiano; --target añade
+    pares explícitos. Una región None se auto-detecta después.
+    """
+    locations = split_values(args.location) or [None]
+    pairs = [
+        (project, location)
+        for project in split_values(args.project)
+        for location in locations
+    ]
+    for spec in split_values(args.target):
+        project, _, location = spec.partition(":")
+        pairs.append((project, location or None))
+    
+    return list(dict.fromkeys(pairs))
+
+
+def print_summary(
+    targets: list[DeploymentTarget],
+    results: list[DeploymentResult],
+    scheduler: Optional[DeployScheduler] = None
+) -> None:
+    """Imprime el resultado agregado de un despliegue con varios destinos."""
+    succeeded = sum(1 for result in results if result.success)
+    several_workflows = len({target.workflow_name for target in targets}) > 1
+    
+    logger.info("═" * 55)
+    logger.info(f"  Resumen: {succeeded}/{len(results)} destinos desplegados")
+    for target, result in zip(targets, results):
+        label = (
+            str(target) if several_workflows
+            else f"{target.project_id}/{target.location}"
+        )
+        if result.success:
+            logger.info(f"  ✓ {label}: {result.message}")
+        else:
+            logger.error(f"  ✗ {label}: {result.message}")
+    if scheduler:
+        logger.info(f"  {scheduler.report_line()}")
+
+
+def print_header(
+    source: GitLabSource | GitLabTree,
+    target: DeploymentTarget,
+    dry_run: bool,
+    target_count: int = 1
+) -> None:
     """Imprime el encabezado con la configuración del despliegue."""
     separator = "═" * 55
     
@@ -733,24 +2687,104 @@ def print_header(source: GitLabSource, target: DeploymentTarget, dry_run: bool)
     logger.info(f"  Workflow   : {target.workflow_name}")
     logger.info(f"  Origen     : {source.project}")
     logger.info(f"  Rama/Tag   : {source.branch}")
-    logger.info(f"  Archivo    : {source.file_path}")
-    logger.info(f"  Proyecto   : {target.project_id}")
+    if isinstance(source, GitLabTree):
+        logger.info(f"  Directorio : {source.directory or '/'} (recursivo, {', '.join(WORKFLOW_EXTENSIONS)})")
+    else:
+        logger.info(f"  Archivo    : {source.file_path}")
+    if target_count > 1:
+        logger.info(f"  Destinos   : {target_count} (proyecto × región)")
+    else:
+        logger.info(f"  Proyecto   : {target.project_id}")
     if dry_run:
         logger.info(f"  Modo       : 🔸 DRY-RUN (simulación)")
     logger.info(separator)
 
 
+def print_history(workflow_name: str, project_id: Optional[str] = None, limit: int = 20) -> None:
+    """Imprime los últimos despliegues de un workflow y la tendencia de duración."""
+    history = DeploymentHistory()
+    try:
+        entries = history.recent(workflow_name, project_id, limit)
+    finally:
+        history.close()
+    
+    if not entries:
+        logger.info(f"Sin despliegues registrados para {workflow_name}")
+        return
+    
+    logger.info(f"Últimos {len(entries)} despliegues de {workflow_name}:")
+    for entry in entries:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.deployed_at))
+        mark = "✓" if entry.success else "✗"
+        duration = f"{entry.duration:6.1f}s" if entry.duration is not None else "     -"
+        logger.info(
+            f"  {mark} {when} │ {entry.project_id}/{entry.location} │ {duration} │ "
+            f"{entry.content_hash[:12]} │ {entry.source}"
+        )
+    
+    durations = [entry.duration for entry in entries if entry.success and entry.duration is not None]
+    if durations:
+        average = sum(durations) / len(durations)
+        logger.info(
+            f"Duración: última {durations[0]:.1f}s │ promedio {average:.1f}s │ "
+            f"mín {min(durations):.1f}s │ máx {max(durations):.1f}s ({len(durations)} exitosos)"
+        )
+
+
+def write_trace(trace_file: Optional[str]) -> None:
+    """Registra el resumen por fase en el log y exporta la traza JSON."""
+    logger.info(tracer.summary_line())
+    
+    if trace_file:
+        path = Path(trace_file)
+    else:
+        millis = int(time.time() * 1000) % 1000
+        path = TRACE_DIR / f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{millis:03d}-{os.getpid()}.json"
+    
+    try:
+        tracer.export(path)
+        logger.info(f"Traza: {path}")
+    except OSError as e:
+        logger.warning(f"No se pudo escribir la traza: {e}")
+
+
 def main() -> None:
     """Punto de entrada principal del programa."""
     parser = create_argument_parser()
     args = parser.parse_args()
+    configure_logging()
+    
+    tracer.reset()
+    try:
+        with tracer.span("deploy.total"):
+            run_deployment(parser, args)
+    finally:
+        # Sin fases del pipeline (--history, errores de argumentos o de token)
+        # no hay nada que trazar, salvo que se pida la traza explícitamente
+        if args.trace_file or set(tracer.summary()) - {"deploy.total"}:
+            write_trace(args.trace_file)
+
+
+def run_deployment(parser: 'argparse.ArgumentParser', args: 'argparse.Namespace') -> None:
+    """Ejecuta el despliegue descrito por los argumentos (termina con sys.exit)."""
+    tree_mode = bool(args.url) and GitLabURLParser.is_tree_url(args.url)
+    if not args.name and not tree_mode:
+        parser.error("--name es requerido (salvo con URLs /-/tree/, donde es un prefijo)")
+    
+    # Consulta del historial: no requiere token ni despliega
+    if args.history:
+        projects = split_values(args.project)
+        print_history(args.name, projects[0] if projects else None)
+        return
     
     # Obtener token de forma segura
     token = get_gitlab_token()
     
     # Parsear fuente
     try:
-        if args.url:
+        if tree_mode:
+            source = GitLabURLParser.parse_tree(args.url)
+        elif args.url:
             source = GitLabURLParser.parse(args.url)
         else:
             if not args.path:
@@ -758,63 +2792,63 @@ def main() -> None:
             source = GitLabSource(
                 project=args.gitlab_project,
                 branch=args.branch,
-                file_path=args.path
+                file_path=args.path,
+                ref_type=args.ref_type
             )
     except ValueError as e:
         logger.error(str(e))
         sys.exit(1)
     
-    # Crear target inicial (location se determina después)
-    target = DeploymentTarget(
-        workflow_name=args.name,
-        project_id=args.project,
-        location=args.location or DEFAULT_LOCATION
-    )
-    
-    # Mostrar configuración
-    print_header(source, target, args.dry_run)
-    
-    # Autenticar con GitLab
-    gitlab = GitLabClient(args.gitlab_url, token)
-    if not gitlab.authenticate():
-        sys.exit(1)
-    
-    # Auto-detectar ubicación si no se especificó
-    if not args.location:
-        logger.info(f"Buscando workflow existente...")
-        detected = GCPWorkflowDeployer.find_existing_location(
-            args.name, 
-            args.project
-        )
-        if detected:
-            target.location = detected
-        else:
-            logger.info(f"Workflow nuevo → {DEFAULT_LOCATION}")
+    # Destinos (las regiones sin especificar se determinan después)
+    target_specs = parse_target_specs(args)
+    if not target_specs:
+        parser.error("Se requiere --project o --target")
     
-    logger.info(f"Ubicación: {target.location}")
+    first_project, first_location = target_specs[0]
+    print_header(
+        source,
+        DeploymentTarget(
+            (f"{args.name}-*" if args.name else "(según archivo)") if tree_mode else args.name,
+            first_project,
+            first_location or DEFAULT_LOCATION
+        ),
+        args.dry_run,
+        target_count=len(target_specs)
+    )
     
-    # Descargar archivo
-    content = gitlab.download_file(source)
-    if not content:
-        sys.exit(1)
+    session = DeploymentSession(
+        args.gitlab_url,
+        token,
+        use_cache=not args.no_cache,
+        max_parallel=args.max_parallel,
+        use_history=not args.no_history,
+        deploy_rate=args.deploy_rate
+    )
     
-    # Validar workflow
-    if not args.skip_validation:
-        is_valid, errors = WorkflowValidator.validate(content)
-        if not is_valid:
-            logger.error("Validación fallida:")
-            for error in errors:
-                logger.error(f"  • {error}")
-            sys.exit(1)
-        logger.info("✓ Validación OK")
+    # Ubicación → descarga → validación → despliegue
+    options = {
+        "dry_run": args.dry_run,
+        "skip_validation": args.skip_validation,
+        "async_mode": args.async_mode,
+        "skip_unchanged": args.skip_unchanged,
+    }
+    if tree_mode:
+        targets, results = session.run_tree(source, target_specs, args.name, **options)
     else:
-        logger.info("⚠ Validación omitida")
+        targets, results = session.run(source, args.name, target_specs, **options)
+    if not results:
+        sys.exit(1)
     
-    # Desplegar
-    result = GCPWorkflowDeployer.deploy(target, content, args.dry_run)
+    # Varios destinos: reportar el agregado
+    if len(targets) > 1:
+        print_summary(targets, results, session.scheduler)
+        sys.exit(0 if all(result.success for result in results) else 1)
     
     # Mostrar resultado
+    result = results[0]
     logger.info("═" * 55)
+    if session.scheduler.retries or session.scheduler.throttle_seconds >= 0.1:
+        logger.info(session.scheduler.report_line())
     if result.success:
         logger.info(f"✓ {result.message}")
         sys.exit(0)